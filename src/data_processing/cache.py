@@ -0,0 +1,79 @@
+import glob
+import hashlib
+import logging
+import os
+from typing import Optional, Callable
+
+import pandas as pd
+
+from src.data_processing.frame_io import save_frame, load_frame
+
+logger = logging.getLogger(__name__)
+
+# Bump this when loaders or transformers change their output so that stale entries are not reused
+CACHE_VERSION = 1
+
+
+def get_file_hash(path: str, block_size: int = 1 << 20) -> str:
+    md5 = hashlib.md5()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            md5.update(block)
+    return md5.hexdigest()
+
+
+class ParseCache:
+    """
+    Persistent cache for transformed data of single export files.
+
+    Entries are stored in binary columnar format and keyed by path, size, modification time and content hash of the
+    source file, so any change to the file results in a cache miss.
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def get(self, path: str, namespace: str, create: Callable[[str], pd.DataFrame]) -> pd.DataFrame:
+        """
+        Get data of the file from the cache. On cache miss data is created with create(path) and stored to the cache.
+        @param path: Path of the source file.
+        @param namespace: Name that identifies how data was created from the file, e.g. loader and transformer.
+        @param create: Function that creates data from the file.
+        @return data.
+        """
+        entry_path = self._get_entry_path(path, namespace)
+        data = self._load(entry_path)
+        if data is not None:
+            logger.debug(f"Cache hit for {path}")
+            return data
+
+        data = create(path)
+        for old_entry_path in glob.glob(os.path.join(self.cache_dir, f"{self._get_path_key(path, namespace)}_*.npz")):
+            os.remove(old_entry_path)
+        try:
+            save_frame(entry_path, data)
+        except Exception as e:
+            logger.warning(f"Cannot write cache entry for {path}. Error: {e}")
+        return data
+
+    @staticmethod
+    def _load(entry_path: str) -> Optional[pd.DataFrame]:
+        if not os.path.exists(entry_path):
+            return None
+        try:
+            return load_frame(entry_path)
+        except Exception as e:
+            logger.warning(f"Cannot read cache entry {entry_path}, ignoring it. Error: {e}")
+            return None
+
+    def _get_entry_path(self, path: str, namespace: str) -> str:
+        stat = os.stat(path)
+        key = f"{stat.st_size} {stat.st_mtime_ns} {get_file_hash(path)}"
+        key_hash = hashlib.md5(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{self._get_path_key(path, namespace)}_{key_hash}.npz")
+
+    @staticmethod
+    def _get_path_key(path: str, namespace: str) -> str:
+        key = f"{CACHE_VERSION} {namespace} {os.path.abspath(path)}"
+        return hashlib.md5(key.encode("utf-8")).hexdigest()
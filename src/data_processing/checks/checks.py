@@ -43,7 +43,7 @@ class StandardCheck(Check):
         if self.filtering is not None:
             df = filter_data(df, **self.filtering)
         if self.grouping:
-            result = df.groupby(self.grouping)["value"]
+            result = df.groupby(self.grouping, observed=True)["value"]
         else:
             result = df["value"]
         if self.aggregation:
@@ -1,11 +1,16 @@
 from functools import partial
-from typing import List, Tuple
+from typing import List, Tuple, Optional
 
 import numpy as np
 import pandas as pd
 
-from src.data_processing.data_filtering import filter_data
-from src.data_processing.parallelization import process_df_parallel
+from src.data_processing.dataset import Dataset
+from src.data_processing.labels import LabelSet
+from src.data_processing.parallelization import ExecutionPlanner
+from src.data_processing.rules import RuleSet, RuleMatchCache
+from src.data_processing.transformers.parsing import amounts_to_cents
+
+DEFAULT_PLANNER = ExecutionPlanner()
 
 
 def calculate_incomes_and_outcomes(data: pd.DataFrame,
@@ -18,13 +23,17 @@ def calculate_incomes_and_outcomes(data: pd.DataFrame,
 
 
 def truncated_pivot_analysis(df, group_by, columns="category", threshold=100, time_fill=True):
-    if time_fill:
-        df = fill_by_time(df)
-    df_pivot = df.pivot_table(columns=columns,
-                              index=group_by,
-                              aggfunc='sum',
-                              fill_value=0,
-                              values='value')
+    if columns == "labels":
+        df_pivot = pivot_by_labels(df, group_by, time_fill=time_fill)
+    else:
+        if time_fill:
+            df = fill_by_time(df)
+        df_pivot = df.pivot_table(columns=columns,
+                                  index=group_by,
+                                  aggfunc='sum',
+                                  fill_value=0,
+                                  values='value',
+                                  observed=True)
 
     output = []
     for i, row in df_pivot.iterrows():
@@ -41,6 +50,35 @@ def truncated_pivot_analysis(df, group_by, columns="category", threshold=100, ti
     return df_pivot_processed
 
 
+def pivot_by_labels(df: pd.DataFrame, index: List[str], aggfunc: str = "sum", time_fill: bool = False) \
+        -> pd.DataFrame:
+    """
+    Same as df.pivot_table(index=index, columns="labels", values="value", aggfunc=aggfunc, fill_value=0), but columns
+    are labels instead of combinations of labels: rows that have several labels are aggregated to each of them, and
+    rows without labels are left out. Aggregates are computed from label bitsets, see labels.LabelSet.
+    @param aggfunc: "sum" or "count".
+    @param time_fill: Include time periods without rows, see fill_by_time.
+    """
+    label_set = LabelSet.from_data(df)
+    grouped = df.groupby(index, observed=True)
+    groups = grouped.ngroup().to_numpy()
+    if aggfunc == "count":
+        pivot = label_set.count(groups)
+    else:
+        # Values can differ from value_cents, e.g. absolute values of outcomes
+        cents = amounts_to_cents(df["value"].to_numpy())
+        pivot = label_set.sum(df["value"].to_numpy() if cents is None else cents, groups)
+        if cents is not None:
+            pivot = pivot / 100
+    # Labels of other rows and groups of data without rows are left out
+    pivot = pivot.iloc[:grouped.ngroups, (label_set.count() > 0).to_numpy()[0]]
+    pivot.index = grouped.size().index
+    pivot.columns.name = "labels"
+    if time_fill and not df.empty:
+        pivot = pivot.reindex(fill_by_time(df[["time"]]).groupby(index).size().index, fill_value=0)
+    return pivot
+
+
 def _separate_incomes_and_outcomes(data: pd.DataFrame) -> pd.DataFrame:
     data['income'] = data['value']
     data['income'][data['income'] < 0] = 0
@@ -58,53 +96,102 @@ def _calculate_cumulative_values(data: pd.DataFrame) -> pd.DataFrame:
     return data
 
 
+def _get_cents(data: pd.DataFrame) -> Optional[np.ndarray]:
+    if "value_cents" in data.columns:
+        return data["value_cents"].to_numpy()
+    return amounts_to_cents(data["value"].to_numpy())
+
+
 def _group_data_by_columns(data: pd.DataFrame, group_by: str) -> pd.DataFrame:
-    data_copy = data.copy()
     grouped_data = pd.DataFrame()
-    data_copy.set_index("time", inplace=True)
-    grouped_sums = data_copy.groupby(pd.Grouper(freq=group_by)).sum()
+    cents = _get_cents(data)
+    if cents is not None:
+        # Sum integer cents to avoid accumulation of floating point errors
+        cents_data = pd.DataFrame({"value": cents,
+                                   "income": np.maximum(cents, 0),
+                                   "outcome": np.abs(np.minimum(cents, 0))},
+                                  index=pd.DatetimeIndex(data["time"]))
+        grouped_sums = cents_data.groupby(pd.Grouper(freq=group_by)).sum() / 100
+    else:
+        data_copy = data[["time", "value", "income", "outcome"]].set_index("time")
+        grouped_sums = data_copy.groupby(pd.Grouper(freq=group_by)).sum()
     grouped_data['total'] = grouped_sums['value']
     grouped_data['income'] = grouped_sums['income']
     grouped_data['outcome'] = grouped_sums['outcome']
     return grouped_data
 
 
-def _categorize(df: pd.DataFrame, specifications: dict) -> List[str]:
-    dfc = df.copy()
-    dfc.reset_index(inplace=True, drop=True)
-    dfc["category"] = "Other"
-    for name, filter_values in specifications.items():
-        filtered = filter_data(dfc, **filter_values)
-        dfc["category"].loc[filtered.index.values] = name
-    return dfc["category"].values.tolist()
+def _get_category_codes(df: pd.DataFrame, rule_set: RuleSet) -> np.ndarray:
+    return rule_set.get_category_codes(df)
 
 
-def _extract_labels(df: pd.DataFrame, specifications: dict) -> List[List[str]]:
-    dfc = df.copy()
-    dfc.reset_index(inplace=True, drop=True)
-    indices_map = {}
-    for label, label_specs in specifications.items():
-        filtered_data = filter_data(dfc, **label_specs)
-        indices_map[label] = filtered_data.index.tolist()
+def _get_packed_masks(df: pd.DataFrame, rule_set: RuleSet) -> np.ndarray:
+    return np.packbits(rule_set.get_masks(df), axis=1)
 
-    index_labels = {index: [] for index in dfc.index}
-    for label, indices in indices_map.items():
-        for i in indices:
-            index_labels[i].append(label)
 
-    return list(index_labels.values())
+def _get_rule_columns(df: pd.DataFrame, rule_set: RuleSet) -> pd.DataFrame:
+    # Only columns used by rules are published to worker processes
+    return df[[column for column in rule_set.columns if column in df.columns]]
 
 
-def extract_labels(df: pd.DataFrame, specifications: dict, n_tasks=None) -> List[List[str]]:
-    f_extract_labels = partial(_extract_labels, specifications=specifications)
-    results = process_df_parallel(df, f_extract_labels, n_tasks)
-    return [item for sublist in results for item in sublist]
+def _get_masks(df: pd.DataFrame, rule_set: RuleSet, planner: ExecutionPlanner, name: str, n_tasks=None) \
+        -> np.ndarray:
+    f_get_packed_masks = partial(_get_packed_masks, rule_set=rule_set)
+    results = planner.run(name, _get_rule_columns(df, rule_set), f_get_packed_masks, len(rule_set.rules), n_tasks)
+    return np.unpackbits(np.concatenate(results), axis=1, count=len(rule_set.rules)).astype(bool)
 
 
-def categorize(df: pd.DataFrame, specifications: dict, n_tasks=None) -> List[str]:
-    f_categorize = partial(_categorize, specifications=specifications)
-    results = process_df_parallel(df, f_categorize, n_tasks)
-    return [item for sublist in results for item in sublist]
+def _get_rule_positions(df: pd.DataFrame, specifications: dict, rule_set: RuleSet, planner: ExecutionPlanner,
+                        cache: RuleMatchCache, dataset: Dataset = None, n_tasks=None) -> List[np.ndarray]:
+    """
+    Get positions of rows that match every rule. Only rules that are not found from cache are evaluated. Every rule is
+    cached with the fingerprint of its own columns, so changes of other columns don't invalidate it.
+    @param dataset: Dataset of df; columns are hashed once per version instead of every call.
+    """
+    dataset = dataset if dataset is not None else Dataset(df)
+    fingerprints = [dataset.get_fingerprint(rule.columns) for rule in rule_set.rules]
+    positions = [cache.get(rule.hash, fingerprint) for rule, fingerprint in zip(rule_set.rules, fingerprints)]
+    missing = [i for i, rule_positions in enumerate(positions) if rule_positions is None]
+    if missing:
+        names = list(specifications)
+        missing_rule_set = RuleSet({names[i]: specifications[names[i]] for i in missing})
+        masks = _get_masks(df, missing_rule_set, planner, "match_rules", n_tasks)
+        for j, i in enumerate(missing):
+            positions[i] = np.flatnonzero(masks[:, j])
+            cache.put(rule_set.rules[i].hash, fingerprints[i], positions[i])
+    return positions
+
+
+def extract_labels(df: pd.DataFrame, specifications: dict, n_tasks=None, planner: ExecutionPlanner = None,
+                   cache: RuleMatchCache = None, dataset: Dataset = None) -> List[List[str]]:
+    return get_label_set(df, specifications, n_tasks, planner, cache, dataset).to_lists()
+
+
+def get_label_set(df: pd.DataFrame, specifications: dict, n_tasks=None, planner: ExecutionPlanner = None,
+                  cache: RuleMatchCache = None, dataset: Dataset = None) -> LabelSet:
+    rule_set = RuleSet(specifications)
+    planner = planner or DEFAULT_PLANNER
+    if cache is None:
+        masks = _get_masks(df, rule_set, planner, "extract_labels", n_tasks)
+    else:
+        positions = _get_rule_positions(df, specifications, rule_set, planner, cache, dataset, n_tasks)
+        masks = rule_set.masks_from_positions(positions, df.shape[0])
+    return rule_set.get_label_set(masks)
+
+
+def categorize(df: pd.DataFrame, specifications: dict, n_tasks=None, planner: ExecutionPlanner = None,
+               cache: RuleMatchCache = None, dataset: Dataset = None) -> List[str]:
+    rule_set = RuleSet(specifications)
+    planner = planner or DEFAULT_PLANNER
+    if cache is None:
+        f_get_category_codes = partial(_get_category_codes, rule_set=rule_set)
+        results = planner.run("categorize", _get_rule_columns(df, rule_set), f_get_category_codes,
+                              len(rule_set.rules), n_tasks)
+        codes = np.concatenate(results)
+    else:
+        positions = _get_rule_positions(df, specifications, rule_set, planner, cache, dataset, n_tasks)
+        codes = rule_set.category_codes_from_positions(positions, df.shape[0])
+    return rule_set.categories_from_codes(codes).tolist()
 
 
 def forecast_by_daily_means(data: pd.DataFrame, fields: Tuple[str]) -> pd.DataFrame:
@@ -152,12 +239,19 @@ def yearly_analysis(df_input,
         if (year == forecast_year) and (result_filtered.shape[0] >= min_amount_data_for_forecasting):
             result_filtered = forecast_by_daily_means(result_filtered, fields)
         for i, field in enumerate(fields):
-            result_filtered[field + "_cumulative"] = result_filtered[field].cumsum().values
+            result_filtered[field + "_cumulative"] = _cumulative_sum(result_filtered[field])
         output[year] = result_filtered
 
     return output
 
 
+def _cumulative_sum(values: pd.Series) -> np.ndarray:
+    cents = amounts_to_cents(values.to_numpy())
+    if cents is None:
+        return values.cumsum().values
+    return cents.cumsum() / 100
+
+
 def fill_by_time(df, time_column="time", freq="D", start=None, end=None):
     if df.empty:
         return df
@@ -171,6 +265,9 @@ def fill_by_time(df, time_column="time", freq="D", start=None, end=None):
     numeric_columns = filled_data.select_dtypes(include='number').columns
     non_numeric_columns = filled_data.select_dtypes(exclude='number').columns
     filled_data[numeric_columns] = filled_data[numeric_columns].fillna(0)
+    for column in filled_data.select_dtypes(include='category').columns:
+        if "FILLED" not in filled_data[column].cat.categories:
+            filled_data[column] = filled_data[column].cat.add_categories("FILLED")
     filled_data[non_numeric_columns] = filled_data[non_numeric_columns].fillna("FILLED")
 
     filled_data['year'] = filled_data['time'].dt.year
@@ -1,8 +1,31 @@
 import datetime
-import re
+import json
+import weakref
+from collections import OrderedDict
+from typing import Tuple, List, Optional, Hashable
 
+import numpy as np
 import pandas as pd
-import regex
+
+from src.data_processing.labels import LabelSet
+from src.data_processing.pattern_matching import match_patterns, contains, is_literal, _case_folder
+from src.data_processing.trigram_index import TrigramIndex
+
+# Number of rows that are used to estimate selectivity of filters
+SELECTIVITY_SAMPLE_SIZE = 1000
+# Key of TimeIndex in DataFrame.attrs
+TIME_INDEX_KEY = "time_index"
+# Key prefix of TextIndex of a column in DataFrame.attrs
+TEXT_INDEX_KEY = "text_index"
+# Key of TextIndexing in DataFrame.attrs
+TEXT_INDEXING_KEY = "text_indexing"
+# Column of labels, see labels.LabelSet
+LABELS_COLUMN = "labels"
+# Text columns of data that has at least this many rows are indexed on first search
+MIN_TEXT_INDEX_ROWS = 100000
+# Default limits of FilterResultCache
+MAX_CACHED_FILTER_RESULTS = 100
+MAX_CACHED_FILTER_POSITIONS = 20000000
 
 
 def filter_data(data: pd.DataFrame,
@@ -20,52 +43,451 @@ def filter_data(data: pd.DataFrame,
                 id: str = None,
                 is_duplicate: bool = None
                 ) -> pd.DataFrame:
-    filtered_data = data.copy()
-
-    filters = [
-        [date_min_filter, "time", min_date],
-        [date_max_filter, "time", max_date],
-        [float_min_filter, "value", min_value],
-        [float_max_filter, "value", max_value],
-        [string_filter, "target", target],
-        [string_filter, "account_number", account_number],
-        [string_filter, "message", message],
-        [string_filter, "event", event],
-        [string_filter, "category", category],
-        [string_filter, "labels", labels],
-        [string_filter, "notes", notes],
-        [string_filter, "id", id],
-        [boolean_filter, "is_duplicate", is_duplicate]
-    ]
-
-    for f in filters:
-        func, col, val = f
-        if val is not None:
-            filtered_data = func(filtered_data, col, val)
-            if filtered_data.empty:
-                return filtered_data
-
-    return filtered_data
+    positions = filter_positions(data, min_date=min_date, max_date=max_date, min_value=min_value,
+                                 max_value=max_value, target=target, account_number=account_number, message=message,
+                                 event=event, category=category, labels=labels, notes=notes, id=id,
+                                 is_duplicate=is_duplicate)
+    return data.take(positions)
+
+
+def filter_positions(data: pd.DataFrame, positions: np.ndarray = None, **filter_values) -> np.ndarray:
+    """
+    Get positions of rows that pass the filters (see filter_data). Every filter is evaluated as a mask only on the
+    rows that passed the earlier filters, and the most selective filters are evaluated first, so no intermediate
+    DataFrames are created. Text columns of large data are searched with TextIndex.
+    @param data: Data.
+    @param positions: Sorted positions of rows that are filtered, all rows if None.
+    @param filter_values: Arguments of filter_data; None values are ignored.
+    @return positions of rows, in the order of data.
+    """
+    unknown_keys = set(filter_values) - set(FILTER_MASKS)
+    if unknown_keys:
+        raise TypeError(f"Unknown filters {sorted(unknown_keys)}")
+    if positions is None:
+        positions = np.arange(data.shape[0])
+    time_range = _get_time_range(data, filter_values.get("min_date"), filter_values.get("max_date"))
+    if time_range is not None:
+        # Date range is a contiguous range of rows of data sorted by time
+        start, stop = np.searchsorted(positions, time_range)
+        positions = positions[start:stop]
+        filter_values = {key: value for key, value in filter_values.items() if key not in ("min_date", "max_date")}
+    predicates = [(mask_function, column, filter_values[key]) for key, (mask_function, column) in FILTER_MASKS.items()
+                  if filter_values.get(key) is not None]
+    for mask_function, column, value in _order_by_selectivity(data, positions, predicates):
+        if len(positions) == 0:
+            break
+        positions = positions[_get_mask(data, positions, mask_function, column, value)]
+    return positions
+
+
+def _get_mask(data: pd.DataFrame, positions: np.ndarray, mask_function, column: str, value) -> np.ndarray:
+    if mask_function is string_mask and column == LABELS_COLUMN:
+        mask = _get_label_mask(data, positions, column, value)
+        if mask is not None:
+            return mask
+    if mask_function is string_mask and data.shape[0] >= MIN_TEXT_INDEX_ROWS and is_text_index_enabled(data):
+        return get_text_index(data, column).mask(value, positions)
+    values = data[column]
+    if len(positions) < len(values):
+        values = values.iloc[positions]
+    return mask_function(values, value)
+
+
+def _get_label_mask(data: pd.DataFrame, positions: np.ndarray, column: str, value: str) -> Optional[np.ndarray]:
+    """
+    Get mask of a label filter from label bitsets (see labels.LabelSet.from_data) if value is a label name. The value
+    then matches the rows that have a label that contains it, same as the regular expression, which is used otherwise.
+    """
+    # Literal without surrounding spaces can't match across separator of labels
+    if not is_literal(value) or value == "" or value != value.strip():
+        return None
+    label_set = LabelSet.from_data(data, column)
+    folded_value, *folded_names = _case_folder.fold([value] + label_set.names)
+    if folded_value not in folded_names:
+        return None
+    names = [name for name, folded_name in zip(label_set.names, folded_names) if folded_value in folded_name]
+    return label_set.take(positions).mask(*names)
+
+
+def _get_time_range(data: pd.DataFrame, min_date, max_date) -> Optional[Tuple[int, int]]:
+    if min_date is None and max_date is None:
+        return None
+    time_index = get_time_index(data)
+    if time_index is None:
+        return None
+    return time_index.get_range(min_date, max_date)
+
+
+def _order_by_selectivity(data: pd.DataFrame, positions: np.ndarray, predicates: list) -> list:
+    # Selectivity of filters is estimated on evenly spaced sample of rows
+    if len(predicates) < 2 or len(positions) <= SELECTIVITY_SAMPLE_SIZE:
+        return predicates
+    sample = positions[np.linspace(0, len(positions) - 1, SELECTIVITY_SAMPLE_SIZE).astype(np.int64)]
+    selectivities = [np.mean(mask_function(data[column].iloc[sample], value))
+                     for mask_function, column, value in predicates]
+    order = np.argsort(selectivities, kind="stable")
+    return [predicates[i] for i in order]
+
+
+class TimeIndex:
+    """
+    Index of data sorted by time. Rows between two dates are a contiguous range of positions that is found with binary
+    search, so date filters don't need to compare every row. Index is valid only for the time column it was created
+    from; it is not updated if the column is modified in place.
+    """
+
+    def __init__(self, times: np.ndarray):
+        """
+        @param times: Sorted datetime64[ns] values of time column.
+        """
+        self.times = times
+
+    @classmethod
+    def from_data(cls, data: pd.DataFrame) -> Optional["TimeIndex"]:
+        """
+        @return index of data, or None if time column is missing, has missing values or is not sorted.
+        """
+        if "time" not in data.columns or data["time"].dtype != np.dtype("datetime64[ns]"):
+            return None
+        if not data["time"].is_monotonic_increasing:
+            return None
+        return cls(data["time"].to_numpy())
+
+    def __deepcopy__(self, memo):
+        # Index is immutable, so copies of data (that copy also attrs) can share it
+        return self
+
+    def is_valid(self, data: pd.DataFrame) -> bool:
+        """
+        @return True if index was created from the time column of data, i.e. the column still has the same memory.
+        """
+        return "time" in data.columns and is_same_array(get_column_array(data["time"]), self.times)
+
+    def get_range(self, min_date=None, max_date=None) -> Optional[Tuple[int, int]]:
+        """
+        @return start and stop positions of rows between dates (inclusive), or None if dates have time zone.
+        """
+        start, stop = 0, len(self.times)
+        for date, side in [(min_date, "left"), (max_date, "right")]:
+            if date is None:
+                continue
+            timestamp = pd.to_datetime(date)
+            if timestamp.tz is not None:
+                return None
+            position = int(np.searchsorted(self.times, np.datetime64(timestamp.value, "ns"), side=side))
+            start, stop = (position, stop) if side == "left" else (start, position)
+        return start, max(start, stop)
+
+
+def get_time_index(data: pd.DataFrame) -> Optional[TimeIndex]:
+    """
+    Get index of data sorted by time. Index is created on first use and stored in data.attrs.
+    @return index, or None if data is not sorted by time.
+    """
+    time_index = data.attrs.get(TIME_INDEX_KEY)
+    if isinstance(time_index, TimeIndex) and time_index.is_valid(data):
+        return time_index
+    time_index = TimeIndex.from_data(data)
+    if time_index is not None:
+        data.attrs[TIME_INDEX_KEY] = time_index
+    return time_index
+
+
+class TextIndex:
+    """
+    Factorized text column with trigram index of its unique values (see trigram_index.TrigramIndex). Index is reused
+    as long as the column has the same memory, e.g. when data is filtered again with different search patterns. Like
+    TimeIndex, it is not updated if the column is modified in place; see clear_text_index.
+    """
+
+    def __init__(self, values: pd.Series):
+        self.array = get_column_array(values)
+        self.codes, uniques = factorize_strings(values)
+        self.trigram_index = TrigramIndex(uniques)
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def is_valid(self, values: pd.Series) -> bool:
+        return is_same_array(get_column_array(values), self.array)
+
+    def mask(self, pattern: str, positions: np.ndarray = None) -> np.ndarray:
+        """
+        Same as string_mask(values.iloc[positions], pattern).
+        """
+        codes = self.codes if positions is None else self.codes[positions]
+        return broadcast_unique_mask(self.trigram_index.contains(pattern.strip()), codes)
+
+
+class TextIndexing:
+    """
+    Marks the data whose text columns are indexed, see enable_text_index. Data derived from it, e.g. rows taken from
+    it, share its attrs and so the marker, but the marker refers only to the data it was created for.
+    """
+
+    def __init__(self, data: pd.DataFrame):
+        self.data = weakref.ref(data)
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+def enable_text_index(data: pd.DataFrame):
+    """
+    Build indexes of text columns of data on first search (see get_text_index). Building an index costs more than
+    a search, so indexes are enabled only for long lived data that is searched many times, like all data of the
+    application. Data derived from it, e.g. filtered rows that tabs filter again, is searched without indexes.
+    """
+    data.attrs[TEXT_INDEXING_KEY] = TextIndexing(data)
+
+
+def is_text_index_enabled(data: pd.DataFrame) -> bool:
+    text_indexing = data.attrs.get(TEXT_INDEXING_KEY)
+    return isinstance(text_indexing, TextIndexing) and text_indexing.data() is data
+
+
+def get_text_index(data: pd.DataFrame, column: str) -> TextIndex:
+    """
+    Get index of text column. Index is created on first use and stored in data.attrs.
+    """
+    key = (TEXT_INDEX_KEY, column)
+    text_index = data.attrs.get(key)
+    if not isinstance(text_index, TextIndex) or not text_index.is_valid(data[column]):
+        text_index = TextIndex(data[column])
+        data.attrs[key] = text_index
+    return text_index
+
+
+def clear_text_index(data: pd.DataFrame, column: str):
+    """
+    Remove index of text column, must be called after modifying the column in place. Index is validated by the
+    identity of the column array, so replacing the column doesn't need this.
+    """
+    data.attrs.pop((TEXT_INDEX_KEY, column), None)
+
+
+def get_column_array(values: pd.Series):
+    """
+    Get array that holds the values of a column. Every access to a numpy backed column creates a new array object, so
+    these are identified by their memory (see is_same_array); other arrays are the same object.
+    """
+    if isinstance(values.dtype, np.dtype):
+        return values.to_numpy()
+    return values.array
+
+
+def is_same_array(array, other) -> bool:
+    """
+    @return True if arrays (see get_column_array) are the same array or numpy views of the same memory.
+    """
+    if isinstance(array, np.ndarray) and isinstance(other, np.ndarray):
+        return array.dtype == other.dtype and array.shape == other.shape and array.strides == other.strides and \
+            array.__array_interface__["data"] == other.__array_interface__["data"]
+    return array is other
+
+
+def get_filter_key(filter_values: dict) -> str:
+    """
+    Normalized filter values; filter values that select same rows from same data get same key. None values are
+    ignored and dates are compared as timestamps.
+    """
+    normalized = {}
+    for key, value in filter_values.items():
+        if value is None:
+            continue
+        if key in ("min_date", "max_date"):
+            value = pd.to_datetime(value).isoformat()
+        normalized[key] = value
+    return json.dumps(normalized, sort_keys=True, default=str)
+
+
+def get_filter_columns(filter_values: dict) -> List[str]:
+    """
+    @return columns that filter values filter by.
+    """
+    return sorted({FILTER_MASKS[key][1] for key, value in filter_values.items()
+                   if key in FILTER_MASKS and value is not None})
+
+
+class FilterResultCache:
+    """
+    Positions of rows that pass filters (see filter_positions), cached by normalized filter values and data version.
+    Data version must change whenever filtered data changes, see dataset.Dataset.get_version. Least recently used
+    results are dropped when the cache has more results or positions than allowed.
+    """
+
+    def __init__(self, max_results: int = MAX_CACHED_FILTER_RESULTS,
+                 max_positions: int = MAX_CACHED_FILTER_POSITIONS):
+        self.max_results = max_results
+        self.max_positions = max_positions
+        self.hits = 0
+        self.misses = 0
+        self._positions = OrderedDict()  # type: OrderedDict[Tuple[str, Hashable], np.ndarray]
+        self._n_positions = 0
+
+    def get(self, filter_values: dict, data_version: Hashable) -> Optional[np.ndarray]:
+        key = (get_filter_key(filter_values), data_version)
+        positions = self._positions.get(key)
+        if positions is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._positions.move_to_end(key)
+        return positions
+
+    def put(self, filter_values: dict, data_version: Hashable, positions: np.ndarray):
+        key = (get_filter_key(filter_values), data_version)
+        if key in self._positions:
+            self._n_positions -= len(self._positions.pop(key))
+        # Cached positions are shared by all users of the result
+        positions.flags.writeable = False
+        self._positions[key] = positions
+        self._n_positions += len(positions)
+        while len(self._positions) > 1 and \
+                (len(self._positions) > self.max_results or self._n_positions > self.max_positions):
+            _, removed = self._positions.popitem(last=False)
+            self._n_positions -= len(removed)
+
+    def filter_positions(self, data: pd.DataFrame, data_version: Hashable, positions: np.ndarray = None,
+                         **filter_values) -> np.ndarray:
+        """
+        Same as filter_positions(data, positions, **filter_values), but result is taken from cache if data has same
+        version. Data version must change also when positions change.
+        """
+        filtered_positions = self.get(filter_values, data_version)
+        if filtered_positions is None:
+            filtered_positions = filter_positions(data, positions, **filter_values)
+            self.put(filter_values, data_version, filtered_positions)
+        return filtered_positions
+
+    def __len__(self):
+        return len(self._positions)
 
 
 def date_min_filter(data, filter_by, date):
-    return data[data[filter_by] >= pd.to_datetime(date)]
+    return data[date_min_mask(data[filter_by], date)]
 
 
 def date_max_filter(data, filter_by, date):
-    return data[data[filter_by] <= pd.to_datetime(date)]
+    return data[date_max_mask(data[filter_by], date)]
 
 
 def float_min_filter(data, filter_by, value):
-    return data[data[filter_by] >= value]
+    return data[float_min_mask(data[filter_by], value)]
 
 
 def float_max_filter(data, filter_by, value):
-    return data[data[filter_by] <= value]
+    return data[float_max_mask(data[filter_by], value)]
 
 def boolean_filter(data, filter_by, value):
-    return data[data[filter_by] == value]
+    return data[boolean_mask(data[filter_by], value)]
 
 def string_filter(data, filter_by, pattern):
-    i = data[filter_by].str.contains(pattern.strip(), flags=re.IGNORECASE)
-    return data[i]
+    return data[string_mask(data[filter_by], pattern)]
+
+
+def date_min_mask(values: pd.Series, date) -> np.ndarray:
+    return (values >= pd.to_datetime(date)).to_numpy()
+
+
+def date_max_mask(values: pd.Series, date) -> np.ndarray:
+    return (values <= pd.to_datetime(date)).to_numpy()
+
+
+def float_min_mask(values: pd.Series, value) -> np.ndarray:
+    return (values >= value).to_numpy()
+
+
+def float_max_mask(values: pd.Series, value) -> np.ndarray:
+    return (values <= value).to_numpy()
+
+
+def boolean_mask(values: pd.Series, value) -> np.ndarray:
+    return (values == value).to_numpy()
+
+
+def string_mask(values: pd.Series, pattern: str) -> np.ndarray:
+    codes, uniques = factorize_strings(values)
+    return broadcast_unique_mask(unique_string_mask(uniques, pattern), codes)
+
+
+def factorize_strings(values: pd.Series) -> Tuple[np.ndarray, pd.Series]:
+    """
+    Get codes and unique values of strings; missing values get code -1. Text columns contain a lot of repeated values,
+    so matching patterns against unique values and broadcasting the result is much faster than matching every row.
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.codes.to_numpy(), pd.Series(values.cat.categories, dtype=object)
+    codes, uniques = pd.factorize(values)
+    return codes, pd.Series(uniques, dtype=object)
+
+
+def unique_string_mask(uniques: pd.Series, pattern: str) -> np.ndarray:
+    return contains(uniques, pattern.strip())
+
+
+def broadcast_unique_mask(unique_mask: np.ndarray, codes: np.ndarray) -> np.ndarray:
+    # Code -1 (missing value) takes the last item, i.e. False
+    return np.append(unique_mask, False)[codes]
+
+
+class FactorizedStrings:
+    """
+    String columns of data factorized on first use. Same column can be matched against many patterns (e.g. when
+    evaluating category rules) and every pattern is matched only once against unique values of the column.
+    """
+
+    def __init__(self, data: pd.DataFrame):
+        self.data = data
+        self._factorized = {}
+        self._unique_masks = {}
+
+    def get(self, column: str) -> Tuple[np.ndarray, pd.Series]:
+        if column not in self._factorized:
+            self._factorized[column] = factorize_strings(self.data[column])
+        return self._factorized[column]
+
+    def get_unique_mask(self, column: str, pattern: str) -> np.ndarray:
+        if (column, pattern) not in self._unique_masks:
+            _, uniques = self.get(column)
+            self._unique_masks[(column, pattern)] = unique_string_mask(uniques, pattern)
+        return self._unique_masks[(column, pattern)]
+
+    def match_unique_values(self, column: str, patterns: List[str]):
+        """
+        Match many patterns against unique values of the column in one scan (see pattern_matching.match_patterns).
+        """
+        patterns = [pattern for pattern in dict.fromkeys(patterns) if (column, pattern) not in self._unique_masks]
+        if not patterns:
+            return
+        _, uniques = self.get(column)
+        matches = match_patterns(uniques, patterns)
+        for i, pattern in enumerate(patterns):
+            self._unique_masks[(column, pattern)] = matches[:, i]
+
+    def mask(self, column: str, pattern: str, positions: np.ndarray = None) -> np.ndarray:
+        """
+        @return mask of rows (at given positions) that match the pattern.
+        """
+        codes, _ = self.get(column)
+        if positions is not None:
+            codes = codes[positions]
+        return broadcast_unique_mask(self.get_unique_mask(column, pattern), codes)
+
+
+# Filter argument: (mask function, column)
+FILTER_MASKS = {
+    "min_date": (date_min_mask, "time"),
+    "max_date": (date_max_mask, "time"),
+    "min_value": (float_min_mask, "value"),
+    "max_value": (float_max_mask, "value"),
+    "target": (string_mask, "target"),
+    "account_number": (string_mask, "account_number"),
+    "message": (string_mask, "message"),
+    "event": (string_mask, "event"),
+    "category": (string_mask, "category"),
+    "labels": (string_mask, "labels"),
+    "notes": (string_mask, "notes"),
+    "id": (string_mask, "id"),
+    "is_duplicate": (boolean_mask, "is_duplicate"),
+}
@@ -1,116 +1,198 @@
-import hashlib
 import logging
 import re
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Iterator
 
 import numpy as np
 import pandas as pd
 
 from src.config_manager import CATEGORIES_KEY, LABELS_KEY, NOTES_KEY
-from src.data_processing.data_analysis import categorize, extract_labels
+from src.data_processing.cache import ParseCache
+from src.data_processing.data_analysis import categorize, get_label_set
+from src.data_processing.data_filtering import get_time_index
+from src.data_processing.dataset import Dataset
+from src.data_processing.ids import get_keys, get_legacy_ids
+from src.data_processing.layout import compact_layout
 from src.data_processing.loaders.new_nordea_loader import NewNordeaLoader
 from src.data_processing.loaders.nordea_loader import NordeaLoader
+from src.data_processing.parallelization import process_parallel, ExecutionPlanner, AUTO
+from src.data_processing.rules import RuleMatchCache
 from src.data_processing.transformers.new_nordea_transformer import NewNordeaTransformer
 from src.data_processing.transformers.nordea_transformer import NordeaTransformer
-from src.data_processing.validation import validate
+from src.data_processing.validation import validate, DEFAULT_SAMPLE_SIZE
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_CHUNK_SIZE = 100000
+# Columns that are computed from configuration, see DataPreprocessor.update_extra_columns
+EXTRA_COLUMNS = ["category", "labels", "notes", "is_duplicate"]
+
 
 class Bank:
 
-    def __init__(self, loader, transformer, regexp_pattern):
+    def __init__(self, loader, transformer, regexp_pattern, cache: ParseCache = None):
         self.loader = loader
         self.transformer = transformer
         self.regexp_pattern = regexp_pattern
+        self.cache = cache
+
+    @property
+    def name(self):
+        return f"{type(self.loader).__name__}-{type(self.transformer).__name__}"
 
     def get_data(self, path):
-        return self.transformer.transform(self.loader.load([path]))
+        if self.cache is None:
+            return self._load_and_transform(path)
+        data = self.cache.get(path, self.name, self._load_and_transform)
+        # Cached data has been fully validated when it was created
+        validate(data, sample_size=DEFAULT_SAMPLE_SIZE)
+        return data
+
+    def iter_data(self, path, chunk_size):
+        for chunk in self.loader.iter_chunks([path], chunk_size):
+            yield self.transformer.transform(chunk)
+
+    def _load_and_transform(self, path):
+        data = self.transformer.transform(self.loader.load([path]))
+        validate(data)
+        return data
+
+
+def _get_bank_data(bank_and_path: Tuple[Bank, str]) -> pd.DataFrame:
+    bank, path = bank_and_path
+    return bank.get_data(path)
 
 
 class DataPreprocessor:
 
-    def __init__(self):
+    def __init__(self, cache_dir: str = None, parallel_loading: bool = False, value_cents: bool = False,
+                 compact_layout: bool = False, execution: str = AUTO):
+        self.parallel_loading = parallel_loading
+        self.value_cents = value_cents
+        self.compact_layout = compact_layout
+        self.planner = ExecutionPlanner(execution)
+        self.rule_cache = RuleMatchCache()
+        cache = ParseCache(cache_dir) if cache_dir else None
         self.banks = [
-            Bank(NordeaLoader(), NordeaTransformer(), "Tapahtumat"),
-            Bank(NewNordeaLoader(), NewNordeaTransformer(), "käyttötili"),
+            Bank(NordeaLoader(), NordeaTransformer(), "Tapahtumat", cache),
+            Bank(NewNordeaLoader(), NewNordeaTransformer(), "käyttötili", cache),
         ]
 
     def get_data(self, file_paths: List[str]) -> pd.DataFrame:
         combined_transformed_data = self.load_and_transform_data(file_paths)
-        validate(combined_transformed_data)
+        # Data of every file has been validated already; check that combined data is consistent
+        validate(combined_transformed_data, sample_size=DEFAULT_SAMPLE_SIZE)
         preprocessed_data = self.preprocess_data(combined_transformed_data)
         return preprocessed_data
 
-    def load_and_transform_data(self, file_paths: List[str]) -> pd.DataFrame:
-        combined_transformed_data = pd.DataFrame()
+    def iter_data(self, file_paths: List[str], config: dict, chunk_size: int = DEFAULT_CHUNK_SIZE) \
+            -> Iterator[pd.DataFrame]:
+        """
+        Load and process data in chunks of at most chunk_size rows, so that memory usage does not depend on the total
+        amount of data. Every chunk is validated, preprocessed and gets categories, labels and notes. Rows are numbered
+        over all the chunks. Duplicate flags need all the data and are not added; see streaming.ChunkStore.
+        @param file_paths: List of file paths.
+        @param config: Configuration.
+        @param chunk_size: Maximum number of rows in chunk.
+        @return iterator of processed chunks.
+        """
+        n_rows = 0
         for path in file_paths:
-            bank_found = False
-            for bank in self.banks:
-                if re.search(bank.regexp_pattern, path, re.IGNORECASE):
-                    bank_data = bank.get_data(path)
-                    combined_transformed_data = pd.concat([combined_transformed_data, bank_data], ignore_index=True)
-                    bank_found = True
-                    break
-
-            if not bank_found:
-                raise Exception(f"Unknown bank for file: {path}")
-        return combined_transformed_data
+            bank = self._get_bank(path)
+            for chunk in bank.iter_data(path, chunk_size):
+                if chunk.empty:
+                    continue
+                chunk.index = pd.RangeIndex(n_rows, n_rows + chunk.shape[0])
+                n_rows += chunk.shape[0]
+                validate(chunk)
+                chunk = self.preprocess_data(chunk)
+                self.add_categories(chunk, config.get(CATEGORIES_KEY))
+                self.add_labels(chunk, config.get(LABELS_KEY))
+                self.add_notes(chunk, config.get(NOTES_KEY))
+                yield self.apply_layout(chunk)
+
+    def load_and_transform_data(self, file_paths: List[str]) -> pd.DataFrame:
+        bank_data_list = self.load_and_transform_files(file_paths)
+        if len(bank_data_list) == 0:
+            return pd.DataFrame()
+        return pd.concat(bank_data_list, ignore_index=True)
+
+    def load_and_transform_files(self, file_paths: List[str]) -> List[pd.DataFrame]:
+        banks = [self._get_bank(path) for path in file_paths]
+        if self.parallel_loading:
+            return process_parallel(list(zip(banks, file_paths)), _get_bank_data)
+        return [bank.get_data(path) for bank, path in zip(banks, file_paths)]
+
+    def _get_bank(self, path: str) -> Bank:
+        for bank in self.banks:
+            if re.search(bank.regexp_pattern, path, re.IGNORECASE):
+                return bank
+        raise Exception(f"Unknown bank for file: {path}")
 
     def drop_data(self, data, drop_data):
         filtered_data, removed_data = self.drop_rows(data, drop_data=drop_data)
         return filtered_data, removed_data
 
-    def update_extra_columns(self, data: pd.DataFrame, config: dict):
+    def update_extra_columns(self, data: pd.DataFrame, config: dict, dataset: Dataset = None):
+        """
+        Update EXTRA_COLUMNS of data in place.
+        @param dataset: Dataset of data, updated columns are reported to it.
+        """
         categories = config.get(CATEGORIES_KEY)
         labels = config.get(LABELS_KEY)
         notes = config.get(NOTES_KEY)
-        self.add_categories(data, categories)
-        self.add_labels(data, labels)
+        self.add_categories(data, categories, dataset)
+        self.add_labels(data, labels, dataset)
         self.add_notes(data, notes)
         self.add_is_duplicate(data)
+        if dataset is not None:
+            dataset.update(["notes", "is_duplicate"])
+        return self.apply_layout(data)
+
+    def apply_layout(self, data: pd.DataFrame) -> pd.DataFrame:
+        if self.compact_layout:
+            compact_layout(data)
         return data
 
     @staticmethod
     def add_is_duplicate(data):
-        grouped_by_id = data.groupby("id").count()
-        duplicates_ids = np.unique(grouped_by_id[grouped_by_id.target > 1].index)
-        data["is_duplicate"] = False
-        for duplicate_id in duplicates_ids:
-            data['is_duplicate'][data.id == duplicate_id] = True
+        ids = data["id"]
+        data["is_duplicate"] = (ids.duplicated(keep=False) & ids.notna()).to_numpy()
 
     @staticmethod
     def add_notes(data, notes):
-        data["notes"] = ""
-        if notes is not None:
-            for event_id, note in notes.items():
-                data.loc[data.id == event_id, "notes"] = note
-
-    @staticmethod
-    def add_labels(data, labels):
+        """
+        Replace notes column of data. Text index of notes (see data_filtering.get_text_index) is validated by the
+        identity of the column, so replacing it is safe; code that edits notes in place must call
+        data_filtering.clear_text_index after the edit.
+        """
+        if notes is None or len(notes) == 0:
+            data["notes"] = ""
+            return
+        ids = data["id"]
+        has_note = ids.isin(list(notes)).to_numpy()
+        data["notes"] = np.where(has_note, ids.map(notes).to_numpy(dtype=object), "").astype(object)
+
+    def add_labels(self, data, labels, dataset: Dataset = None):
         if labels is not None:
-            data_labels = extract_labels(data, labels)
-            data["labels"] = [" | ".join(l) for l in data_labels]
+            label_set = get_label_set(data, labels, planner=self.planner, cache=self.rule_cache, dataset=dataset)
+            label_set.set_column(data)
         else:
             data["labels"] = "NA"
+        if dataset is not None:
+            dataset.update(["labels"])
 
-    @staticmethod
-    def add_categories(data, categories):
+    def add_categories(self, data, categories, dataset: Dataset = None):
         if categories is not None:
-            data["category"] = categorize(data, categories)
+            data["category"] = categorize(data, categories, planner=self.planner, cache=self.rule_cache,
+                                          dataset=dataset)
         else:
             data["category"] = "NA"
+        if dataset is not None:
+            dataset.update(["category"])
 
     @staticmethod
-    def get_ids(data: pd.DataFrame) -> List[str]:
-        s = data['account_number'].copy()
-        s += " " + data['target']
-        s += " " + data['message']
-        s += " " + data['account_number']
-        s += " " + data['event']
-        s += " " + data['value'].astype(str)
-        s += " " + data['time'].astype(str)
-        return [hashlib.md5(i.encode('utf-8')).hexdigest() for i in s]
+    def get_ids(data: pd.DataFrame) -> np.ndarray:
+        return get_legacy_ids(data)
 
     def preprocess_data(self, data: pd.DataFrame) -> pd.DataFrame:
         str_columns = ['account_number', 'message', 'event', 'target']
@@ -119,15 +201,35 @@ class DataPreprocessor:
         data['month'] = data['time'].dt.month
         data['week'] = data['time'].dt.isocalendar().week
         data['day'] = data['time'].dt.day
-        data['id'] = self.get_ids(data)
-        data_processed = data.sort_values('time')
+        data['key'] = get_keys(data)
+        data['id'] = get_legacy_ids(data, data['key'].to_numpy())
+        if self.value_cents:
+            # Exact integer representation of value; sums of value_cents are free of floating point errors
+            data['value_cents'] = np.round(data['value'].to_numpy() * 100).astype(np.int64)
+        data_processed = self.apply_layout(data.sort_values('time'))
+        # Data is sorted by time, so date filters can use binary search
+        get_time_index(data_processed)
         return data_processed
 
     @staticmethod
     def drop_rows(data: pd.DataFrame, drop_data: Dict[str, list]) -> Tuple[pd.DataFrame, pd.DataFrame]:
-        data_removed = pd.DataFrame(columns=data.columns)
-        for column_name, row_name in drop_data.items():
-            i = data[column_name].isin(row_name)
-            data_removed = pd.concat([data_removed, data.loc[i]])
-            data = data.loc[~i]
-        return data, data_removed
+        if len(drop_data) == 0:
+            return data, data.iloc[:0]
+        kept_positions, removed_positions = DataPreprocessor.get_drop_positions(data, drop_data)
+        return data.take(kept_positions), data.take(removed_positions)
+
+    @staticmethod
+    def get_drop_positions(data: pd.DataFrame, drop_data: Dict[str, list]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get positions of rows that are kept and removed by drop_rows, without copying data.
+        @return sorted positions of kept rows and positions of removed rows in the order of drop_rows.
+        """
+        # Row is removed by the first column that matches it. Removed rows are ordered by that column and then by
+        # position, i.e. in the order they would be removed one column at a time.
+        drop_column = np.full(data.shape[0], len(drop_data))
+        for i, (column_name, values) in reversed(list(enumerate(drop_data.items()))):
+            drop_column[data[column_name].isin(values).to_numpy()] = i
+        is_removed = drop_column < len(drop_data)
+        removed_positions = np.flatnonzero(is_removed)
+        removed_positions = removed_positions[np.argsort(drop_column[removed_positions], kind="stable")]
+        return np.flatnonzero(~is_removed), removed_positions
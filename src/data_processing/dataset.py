@@ -0,0 +1,83 @@
+import hashlib
+from typing import List, Dict, Tuple, Optional
+
+import pandas as pd
+
+from src.data_processing.ids import KEY_COLUMNS
+
+# Column of row keys (see ids.get_keys); it identifies the values of KEY_COLUMNS
+KEY_COLUMN = "key"
+
+
+class Dataset:
+    """
+    Processed data with versions. Version is incremented on every change and every column has the version of its
+    latest change, so derived state, e.g. cached filter results, can be validated with versions of the columns it
+    depends on instead of comparing data. Changes must be reported with replace or update.
+    """
+
+    def __init__(self, data: pd.DataFrame = None):
+        self.data = data if data is not None else pd.DataFrame()
+        self.version = 0
+        # Version of the latest change of rows, i.e. replacing data
+        self.rows_version = 0
+        self.column_versions = {column: 0 for column in self.data.columns}  # type: Dict[str, int]
+        # Hashes of rows (None) and columns with the version they were computed at
+        self._hashes = {}  # type: Dict[Optional[str], Tuple[Tuple[int, ...], bytes]]
+
+    def replace(self, data: pd.DataFrame):
+        """
+        Replace data; rows and all columns change.
+        """
+        self.version += 1
+        self.data = data
+        self.rows_version = self.version
+        self.column_versions = {column: self.version for column in data.columns}
+
+    def update(self, columns: List[str]):
+        """
+        Report that columns of data have been modified or added.
+        """
+        self.version += 1
+        for column in columns:
+            self.column_versions[column] = self.version
+
+    def get_version(self, columns: List[str] = None) -> Tuple[int, ...]:
+        """
+        @param columns: Columns, all columns if None.
+        @return version that changes whenever rows or given columns change.
+        """
+        if columns is None:
+            return (self.version,)
+        return (self.rows_version,) + tuple(self.column_versions.get(column, -1) for column in columns)
+
+    def get_fingerprint(self, columns: List[str] = None) -> str:
+        """
+        Get fingerprint of the content of rows and given columns. Unlike versions, fingerprint is equal for equal data,
+        e.g. after loading the same files again, so it validates state that outlives the dataset, like cached rule
+        matches. Every column is hashed once per version.
+        @param columns: Columns, all columns if None.
+        """
+        has_key = KEY_COLUMN in self.data.columns
+        digest = hashlib.blake2b(self._get_hash(None), digest_size=16)
+        for column in self.data.columns if columns is None else columns:
+            if has_key and column in KEY_COLUMNS:
+                continue
+            digest.update(column.encode("utf-8"))
+            digest.update(self._get_hash(column))
+        return digest.hexdigest()
+
+    def _get_hash(self, column: Optional[str]) -> bytes:
+        # Rows are identified by their count and keys
+        version = self.get_version([KEY_COLUMN if column is None else column])
+        if column not in self._hashes or self._hashes[column][0] != version:
+            if column is None:
+                digest = hashlib.blake2b(str(self.data.shape[0]).encode("utf-8"), digest_size=16)
+                if KEY_COLUMN in self.data.columns:
+                    digest.update(self.data[KEY_COLUMN].to_numpy().tobytes())
+            else:
+                digest = hashlib.blake2b(digest_size=16)
+                if column in self.data.columns:
+                    digest.update(pd.util.hash_pandas_object(self.data[column], index=False).to_numpy().tobytes())
+            self._hashes[column] = (version, digest.digest())
+        return self._hashes[column][1]
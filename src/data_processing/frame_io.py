@@ -0,0 +1,160 @@
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+FORMAT_VERSION = 1
+
+STRINGS_KIND = "strings"
+CATEGORY_KIND = "category"
+NULLABLE_KIND = "nullable"
+NUMPY_KIND = "numpy"
+
+
+def encode_column(series: pd.Series) -> dict:
+    """
+    Encode column to plain numpy arrays. Text is stored as int32 codes + unique values so that heavily repeated
+    strings are written only once.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return {"kind": CATEGORY_KIND,
+                "codes": series.cat.codes.to_numpy().astype(np.int32),
+                "uniques": _to_unicode_array(series.cat.categories.to_numpy())}
+    if isinstance(series.dtype, pd.api.extensions.ExtensionDtype) and hasattr(series.array, "_mask"):
+        return {"kind": NULLABLE_KIND,
+                "dtype": str(series.dtype),
+                "values": series.array._data,
+                "mask": series.array._mask}
+    if series.dtype == object or isinstance(series.dtype, pd.StringDtype):
+        codes, uniques = pd.factorize(series, use_na_sentinel=True)
+        if not all(isinstance(u, str) for u in uniques):
+            raise ValueError(f"Column {series.name} contains values that are not strings")
+        return {"kind": STRINGS_KIND,
+                "dtype": str(series.dtype),
+                "codes": codes.astype(np.int32),
+                "uniques": _to_unicode_array(np.asarray(uniques, dtype=object))}
+    if isinstance(series.dtype, pd.api.extensions.ExtensionDtype):
+        raise ValueError(f"Column {series.name} has unsupported dtype {series.dtype}")
+    return {"kind": NUMPY_KIND, "values": series.to_numpy()}
+
+
+def decode_column(encoded: dict) -> pd.api.extensions.ExtensionArray:
+    kind = encoded["kind"]
+    if kind == CATEGORY_KIND:
+        return pd.Categorical.from_codes(encoded["codes"], categories=encoded["uniques"].astype(object))
+    if kind == NULLABLE_KIND:
+        array_type = pd.api.types.pandas_dtype(encoded["dtype"]).construct_array_type()
+        return array_type(encoded["values"], encoded["mask"])
+    if kind == STRINGS_KIND:
+        codes = encoded["codes"]
+        values = encoded["uniques"].astype(object).take(codes) if len(encoded["uniques"]) else \
+            np.full(len(codes), np.nan, dtype=object)
+        values[codes < 0] = np.nan
+        if encoded["dtype"] != "object":
+            return pd.array(values, dtype=encoded["dtype"])
+        return values
+    return encoded["values"]
+
+
+def save_frame(path: str, data: pd.DataFrame) -> None:
+    """
+    Save DataFrame to binary columnar npz file. The file is written atomically.
+    """
+    meta = {"version": FORMAT_VERSION, "columns": [], "kinds": [], "dtypes": []}
+    arrays = {"__index__": data.index.to_numpy().astype(np.int64)}
+    for i, column in enumerate(data.columns):
+        encoded = encode_column(data[column])
+        meta["columns"].append(column)
+        meta["kinds"].append(encoded["kind"])
+        meta["dtypes"].append(encoded.get("dtype"))
+        for key in ["values", "codes", "uniques", "mask"]:
+            if key in encoded:
+                arrays[f"{key}_{i}"] = encoded[key]
+    arrays["__meta__"] = np.array(json.dumps(meta))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def load_frame(path: str) -> pd.DataFrame:
+    with np.load(path, allow_pickle=False) as npz:
+        meta = json.loads(str(npz["__meta__"]))
+        if meta["version"] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported frame format version {meta['version']}")
+        columns = {}
+        for i, (column, kind, dtype) in enumerate(zip(meta["columns"], meta["kinds"], meta["dtypes"])):
+            encoded = {"kind": kind, "dtype": dtype}
+            for key in ["values", "codes", "uniques", "mask"]:
+                if f"{key}_{i}" in npz:
+                    encoded[key] = npz[f"{key}_{i}"]
+            columns[column] = decode_column(encoded)
+        index = npz["__index__"]
+    return pd.DataFrame(columns, index=index)
+
+
+def save_frame_columns(directory: str, data: pd.DataFrame) -> None:
+    """
+    Save DataFrame to directory with one npy file per array, so that columns can be memory mapped when loading. Data is
+    written to temporary directory first, so directory appears only when all the data has been written.
+    """
+    parent = os.path.dirname(os.path.abspath(directory))
+    tmp_directory = tempfile.mkdtemp(dir=parent, suffix=".tmp")
+    try:
+        meta = {"version": FORMAT_VERSION, "columns": [], "kinds": [], "dtypes": [], "arrays": []}
+        np.save(os.path.join(tmp_directory, "index.npy"), data.index.to_numpy().astype(np.int64))
+        for i, column in enumerate(data.columns):
+            encoded = encode_column(data[column])
+            meta["columns"].append(column)
+            meta["kinds"].append(encoded["kind"])
+            meta["dtypes"].append(encoded.get("dtype"))
+            keys = [key for key in ["values", "codes", "uniques", "mask"] if key in encoded]
+            meta["arrays"].append(keys)
+            for key in keys:
+                np.save(os.path.join(tmp_directory, f"{key}_{i}.npy"), encoded[key], allow_pickle=False)
+        with open(os.path.join(tmp_directory, "meta.json"), "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_directory, directory)
+    except Exception:
+        shutil.rmtree(tmp_directory, ignore_errors=True)
+        raise
+
+
+def load_frame_columns(directory: str, mmap: bool = True) -> pd.DataFrame:
+    """
+    Load DataFrame saved with save_frame_columns. With mmap, numeric and datetime columns are memory mapped
+    copy-on-write: they are not copied to memory, only the pages that are accessed are read from disk and changes are
+    not written back to the files. Text is decoded to memory.
+    """
+    with open(os.path.join(directory, "meta.json")) as f:
+        meta = json.load(f)
+    if meta["version"] != FORMAT_VERSION:
+        raise ValueError(f"Unsupported frame format version {meta['version']}")
+    mmap_mode = "c" if mmap else None
+    columns = {}
+    for i, (column, kind, dtype, keys) in enumerate(zip(meta["columns"], meta["kinds"], meta["dtypes"],
+                                                         meta["arrays"])):
+        encoded = {"kind": kind, "dtype": dtype}
+        for key in keys:
+            encoded[key] = np.load(os.path.join(directory, f"{key}_{i}.npy"), mmap_mode=mmap_mode,
+                                   allow_pickle=False)
+        columns[column] = decode_column(encoded)
+    index = np.load(os.path.join(directory, "index.npy"), mmap_mode=mmap_mode)
+    # Without copy=False DataFrame would consolidate columns, i.e. copy them to memory
+    return pd.DataFrame(columns, index=pd.Index(index, copy=False), copy=False)
+
+
+def _to_unicode_array(values: np.ndarray) -> np.ndarray:
+    if len(values) == 0:
+        return np.array([], dtype="U1")
+    return values.astype(str)
@@ -0,0 +1,53 @@
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+KEY_COLUMNS = ["account_number", "target", "message", "event", "value", "time"]
+# Order of fields in strings that legacy ids are computed from
+LEGACY_ID_COLUMNS = ["account_number", "target", "message", "account_number", "event", "value", "time"]
+
+
+def get_keys(data: pd.DataFrame) -> np.ndarray:
+    """
+    Get 64-bit keys of transactions by hashing the columns that identify a transaction. Keys are compact and fast to
+    compute, so they are used for joins and comparisons within the application.
+    @param data: Preprocessed data.
+    @return keys as uint64 array.
+    """
+    return pd.util.hash_pandas_object(data[KEY_COLUMNS], index=False).to_numpy()
+
+
+def get_legacy_ids(data: pd.DataFrame, keys: np.ndarray = None) -> np.ndarray:
+    """
+    Get md5 hex ids of transactions. Ids are identical to the ids of earlier versions, so notes saved to config keep
+    working. Hash is computed only once for every distinct transaction.
+    @param data: Preprocessed data.
+    @param keys: Keys of data, see get_keys.
+    @return ids as object array.
+    """
+    if data.shape[0] == 0:
+        return np.array([], dtype=object)
+    if keys is None:
+        keys = get_keys(data)
+    _, first_positions, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    unique_data = data.iloc[first_positions]
+    columns = {column: _to_strings(unique_data[column]) for column in set(LEGACY_ID_COLUMNS)}
+    md5 = hashlib.md5
+    ids = np.array([md5(" ".join(fields).encode("utf-8")).hexdigest()
+                    for fields in zip(*[columns[column] for column in LEGACY_ID_COLUMNS])], dtype=object)
+    return ids[inverse]
+
+
+def _to_strings(values: pd.Series) -> np.ndarray:
+    """
+    Same as values.astype(str), but only unique values are converted.
+    """
+    if pd.api.types.is_float_dtype(values.dtype):
+        # Factorize bits, since 0.0 and -0.0 are equal but have different strings
+        codes, uniques = pd.factorize(values.to_numpy().view(np.int64))
+        strings = pd.Series(uniques.view(np.float64)).astype(str).to_numpy()
+    else:
+        codes, uniques = pd.factorize(values, use_na_sentinel=False)
+        strings = pd.Series(uniques).astype(str).to_numpy()
+    return strings[codes]
@@ -0,0 +1,175 @@
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+LABEL_SEPARATOR = " | "
+# Key prefix of LabelSet of a column in DataFrame.attrs
+LABEL_SET_KEY = "label_set"
+
+
+class LabelSet:
+    """
+    Labels of rows as bitsets. Rows that have the same combination of labels share one code, and combinations are
+    stored as packed bits (combinations x labels). Label masks and per label aggregations are computed from the
+    combinations and broadcast to rows with codes, and display strings are rendered once per combination.
+    """
+
+    def __init__(self, names: List[str], bits: np.ndarray, codes: np.ndarray, categories: pd.Index = None):
+        """
+        @param names: Label names.
+        @param bits: Packed bits of label combinations, see np.packbits.
+        @param codes: Combination of every row.
+        @param categories: Categories of the label column that has the combinations in the same order, see from_data.
+        """
+        self.names = names
+        self.bits = bits
+        self.codes = codes
+        self.categories = categories
+
+    def __deepcopy__(self, memo):
+        # Label set is immutable, so data.attrs of derived data can share it
+        return self
+
+    @classmethod
+    def from_masks(cls, names: List[str], masks: np.ndarray) -> "LabelSet":
+        """
+        @param names: Label names.
+        @param masks: Boolean matrix (rows x labels).
+        """
+        if masks.shape[0] == 0 or masks.shape[1] == 0:
+            return cls(names, np.zeros((1, (masks.shape[1] + 7) // 8), dtype=np.uint8),
+                       np.zeros(masks.shape[0], dtype=np.int64))
+        bits, codes = np.unique(np.packbits(masks, axis=1), axis=0, return_inverse=True)
+        return cls(names, bits, codes.reshape(-1))
+
+    @classmethod
+    def from_column(cls, labels: pd.Series, names: List[str] = None) -> "LabelSet":
+        """
+        Parse label column created with to_column. Missing values have no labels.
+        @param names: Label names, names found from the column if None.
+        """
+        if isinstance(labels.dtype, pd.CategoricalDtype):
+            categories = labels.cat.categories
+            codes, uniques = labels.cat.codes.to_numpy(), categories
+        else:
+            categories = None
+            codes, uniques = pd.factorize(labels)
+        parsed = [value.split(LABEL_SEPARATOR) if isinstance(value, str) and value != "" else []
+                  for value in uniques]
+        if names is None:
+            names = list(dict.fromkeys(name for combination in parsed for name in combination))
+        indices = {name: i for i, name in enumerate(names)}
+        # Last combination is for missing values
+        combinations = np.zeros((len(uniques) + 1, len(names)), dtype=bool)
+        for i, combination in enumerate(parsed):
+            combinations[i, [indices[name] for name in combination]] = True
+        codes = np.where(codes < 0, len(uniques), codes)
+        return cls(names, np.packbits(combinations, axis=1), codes, categories)
+
+    @classmethod
+    def from_data(cls, data: pd.DataFrame, column: str = "labels") -> "LabelSet":
+        """
+        Get label set of a label column of data. Label set is kept in data.attrs (see set_column), so the column is
+        parsed at most once for data and rows taken from it. Stored label set is valid as long as the column has the
+        same categories, its codes are the category codes of the column.
+        """
+        labels = data[column]
+        key = (LABEL_SET_KEY, column)
+        label_set = data.attrs.get(key)  # type: Optional[LabelSet]
+        if label_set is not None and isinstance(labels.dtype, pd.CategoricalDtype) and \
+                labels.cat.categories is label_set.categories:
+            codes = labels.cat.codes.to_numpy()
+            return cls(label_set.names, label_set.bits, np.where(codes < 0, len(label_set.categories), codes),
+                       label_set.categories)
+        label_set = cls.from_column(labels)
+        if label_set.categories is not None:
+            data.attrs[key] = label_set
+        return label_set
+
+    def set_column(self, data: pd.DataFrame, column: str = "labels"):
+        """
+        Set labels as a column of data (see to_column) and keep the label set in data.attrs for from_data.
+        """
+        values = self.to_column()
+        data[column] = values
+        key = (LABEL_SET_KEY, column)
+        strings = self._get_strings()
+        if len(values.categories) < len(strings):
+            # Names that contain separator gave same string for different combinations
+            data.attrs.pop(key, None)
+            return
+        # Combinations in the order of categories, last one is for missing values
+        combinations = np.zeros((len(values.categories) + 1, len(self.names)), dtype=bool)
+        combinations[values.categories.get_indexer(strings)] = self.get_combinations()
+        data.attrs[key] = LabelSet(self.names, np.packbits(combinations, axis=1), values.codes.astype(np.int64),
+                                   data[column].cat.categories)
+
+    def take(self, positions: np.ndarray) -> "LabelSet":
+        """
+        @return label set of rows at given positions.
+        """
+        return LabelSet(self.names, self.bits, self.codes[positions], self.categories)
+
+    def get_combinations(self) -> np.ndarray:
+        """
+        @return boolean matrix (combinations x labels).
+        """
+        return np.unpackbits(self.bits, axis=1, count=len(self.names)).astype(bool)
+
+    def get_matrix(self) -> np.ndarray:
+        """
+        @return boolean matrix (rows x labels).
+        """
+        return self.get_combinations()[self.codes]
+
+    def mask(self, *names: str) -> np.ndarray:
+        """
+        @return mask of rows that have any of the labels.
+        """
+        indices = [self.names.index(name) for name in names]
+        return self.get_combinations()[:, indices].any(axis=1)[self.codes]
+
+    def count(self, groups: np.ndarray = None) -> pd.DataFrame:
+        """
+        Get number of rows per label; rows that have several labels are counted for each of them.
+        @param groups: Group of every row as integers 0, 1, ..., all rows are one group if None.
+        @return counts (groups x labels).
+        """
+        return self._aggregate(None, groups)
+
+    def sum(self, values: np.ndarray, groups: np.ndarray = None) -> pd.DataFrame:
+        """
+        Get sum of values per label, see count.
+        @return sums (groups x labels).
+        """
+        return self._aggregate(values, groups)
+
+    def _aggregate(self, weights: Optional[np.ndarray], groups: Optional[np.ndarray]) -> pd.DataFrame:
+        n_combinations = self.bits.shape[0]
+        n_groups = 1 if groups is None or len(groups) == 0 else int(groups.max()) + 1
+        # Totals of every combination in every group, then of every label
+        group_codes = self.codes if groups is None else groups.astype(np.int64) * n_combinations + self.codes
+        totals = np.bincount(group_codes, weights=weights, minlength=n_groups * n_combinations)
+        totals = totals.reshape(n_groups, n_combinations) @ self.get_combinations().astype(totals.dtype)
+        return pd.DataFrame(totals, columns=self.names)
+
+    def to_column(self) -> pd.Categorical:
+        """
+        Get labels as categorical column of display strings, e.g. "label 1 | label 2".
+        """
+        strings = self._get_strings()
+        # Names that contain separator could give same string for different combinations
+        categories = pd.Index(sorted(set(strings)), dtype=object)
+        return pd.Categorical.from_codes(categories.get_indexer(strings)[self.codes], categories=categories)
+
+    def to_lists(self) -> List[List[str]]:
+        combination_lists = self._get_combination_lists()
+        return [combination_lists[code] for code in self.codes]
+
+    def _get_strings(self) -> List[str]:
+        return [LABEL_SEPARATOR.join(combination) for combination in self._get_combination_lists()]
+
+    def _get_combination_lists(self) -> List[List[str]]:
+        names = np.array(self.names, dtype=object)
+        return [names[combination].tolist() for combination in self.get_combinations()]
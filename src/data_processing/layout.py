@@ -0,0 +1,38 @@
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+
+    FREE_TEXT_DTYPE = pd.StringDtype("pyarrow")
+except ImportError:
+    FREE_TEXT_DTYPE = None
+
+TEXT_COLUMNS = ["target", "account_number", "message", "event", "bank", "category", "labels"]
+CALENDAR_DTYPES = {"year": "int16", "month": "int8", "week": "int8", "day": "int8"}
+# Text columns with at most this ratio of unique values to rows are stored as category
+MAX_CATEGORY_RATIO = 0.5
+
+
+def compact_layout(data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convert columns of processed data to compact dtypes in place: low cardinality text to category, other text to Arrow
+    backed strings (if pyarrow is installed) and calendar fields to small integers.
+    @param data: Processed data.
+    @return data.
+    """
+    if data.empty:
+        return data
+    for column, dtype in CALENDAR_DTYPES.items():
+        if column in data.columns and data[column].dtype != dtype:
+            values = data[column]
+            # Missing dates result missing calendar fields, these need nullable type
+            data[column] = values.astype(dtype.capitalize() if values.isna().any() else dtype)
+    for column in TEXT_COLUMNS:
+        if column not in data.columns or data[column].dtype != object:
+            continue
+        values = data[column]
+        if values.nunique(dropna=False) <= MAX_CATEGORY_RATIO * len(values):
+            data[column] = values.astype("category")
+        elif FREE_TEXT_DTYPE is not None:
+            data[column] = values.astype(FREE_TEXT_DTYPE)
+    return data
@@ -0,0 +1,90 @@
+import bz2
+import gzip
+import io
+import lzma
+import os
+import zipfile
+from contextlib import contextmanager
+from typing import List, Tuple, Iterator, TextIO
+
+import pandas as pd
+
+COMPRESSED_OPENERS = {
+    ".gz": gzip.open,
+    ".xz": lzma.open,
+    ".bz2": bz2.open,
+}
+
+
+@contextmanager
+def open_export(path: str, encoding: str = "utf-8") -> Iterator[TextIO]:
+    """
+    Open export file as text. Compressed files (gz, zip, xz, bz2) are decompressed on the fly. Zip archive needs to
+    contain exactly one file.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".zip":
+        with zipfile.ZipFile(path) as archive:
+            names = archive.namelist()
+            if len(names) != 1:
+                raise ValueError(f"Zip archive {path} should contain exactly one file, found {len(names)}")
+            with archive.open(names[0]) as f:
+                yield io.TextIOWrapper(f, encoding=encoding)
+    elif extension in COMPRESSED_OPENERS:
+        with COMPRESSED_OPENERS[extension](path, "rt", encoding=encoding) as f:
+            yield f
+    else:
+        with open(path, encoding=encoding) as f:
+            yield f
+
+
+def read_preamble(handle: TextIO, n_lines: int, sep: str) -> List[List[str]]:
+    """
+    Read lines preceding the header of the table and split them into fields.
+    """
+    return [handle.readline().rstrip("\r\n").split(sep) for _ in range(n_lines)]
+
+
+def read_table(handle: TextIO, sep: str, columns: List[str], **kwargs) -> pd.DataFrame:
+    """
+    Read table from the current position of the handle. Only the given columns are parsed and all of them are read as
+    strings, so no type inference is done.
+    """
+    return pd.read_csv(handle,
+                       sep=sep,
+                       header=0,
+                       index_col=False,
+                       usecols=columns,
+                       dtype={column: str for column in columns},
+                       engine="c",
+                       **kwargs)
+
+
+def read_export(path: str, sep: str, columns: List[str], n_preamble_lines: int = 0) \
+        -> Tuple[List[List[str]], pd.DataFrame]:
+    """
+    Read preamble and table of the export file in single pass over the file.
+    @param path: Path of the file, can be compressed.
+    @param sep: Field separator.
+    @param columns: Columns of the table to read.
+    @param n_preamble_lines: Number of lines before header of the table.
+    @return preamble fields and table.
+    """
+    with open_export(path) as handle:
+        preamble = read_preamble(handle, n_preamble_lines, sep)
+        table = read_table(handle, sep, columns)
+    return preamble, table
+
+
+def iter_export(path: str, sep: str, columns: List[str], chunk_size: int, n_preamble_lines: int = 0) \
+        -> Iterator[Tuple[List[List[str]], pd.DataFrame]]:
+    """
+    Read preamble and table of the export file in single pass over the file, table in chunks of at most chunk_size
+    rows.
+    @return iterator of preamble fields and table chunk.
+    """
+    with open_export(path) as handle:
+        preamble = read_preamble(handle, n_preamble_lines, sep)
+        with read_table(handle, sep, columns, chunksize=chunk_size) as reader:
+            for chunk in reader:
+                yield preamble, chunk
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List
+from typing import List, Iterator
 
 import pandas as pd
 
@@ -20,3 +20,16 @@ class LoaderInterface(ABC):
         @return raw data.
         """
         raise NotImplementedError
+
+    def iter_chunks(self, file_paths: List[str], chunk_size: int) -> Iterator[pd.DataFrame]:
+        """
+        Load data from file paths in chunks of at most chunk_size rows. Default implementation loads one file at a time
+        and splits it; inheritor can override this to read files incrementally.
+        @param file_paths: List of file paths
+        @param chunk_size: Maximum number of rows in chunk.
+        @return iterator of raw data chunks.
+        """
+        for path in file_paths:
+            data = self.load([path])
+            for start in range(0, data.shape[0], chunk_size):
+                yield data.iloc[start:start + chunk_size]
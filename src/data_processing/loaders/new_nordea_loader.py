@@ -1,18 +1,36 @@
+import os
 import re
-from typing import List
+from typing import List, Iterator
 
 import pandas as pd
 
+from src.data_processing.loaders.export_reader import read_export, iter_export
 from src.data_processing.loaders.loader_interface import LoaderInterface
 
+ACCOUNT_NUMBER_PATTERN = re.compile("tili (.*) -", re.IGNORECASE)
+
 
 class NewNordeaLoader(LoaderInterface):
+    columns = ["Kirjauspäivä", "Määrä", "Otsikko"]
 
     def load(self, file_paths: List[str]) -> pd.DataFrame:
         raw_data_list = []
         for path in file_paths:
-            df = pd.read_csv(path, sep=';', header=0, index_col=False)
-            df["Tilinumero"] = re.findall("tili (.*) -", path, re.IGNORECASE)[0].replace(' ', '')
+            _, df = read_export(path, sep=';', columns=self.columns)
+            df["Tilinumero"] = self._get_account_number(path)
             raw_data_list.append(df)
+        if len(raw_data_list) == 1:
+            return raw_data_list[0]
         data = pd.concat(raw_data_list)
         return data
+
+    def iter_chunks(self, file_paths: List[str], chunk_size: int) -> Iterator[pd.DataFrame]:
+        for path in file_paths:
+            account_number = self._get_account_number(path)
+            for _, df in iter_export(path, sep=';', columns=self.columns, chunk_size=chunk_size):
+                df["Tilinumero"] = account_number
+                yield df
+
+    @staticmethod
+    def _get_account_number(path: str) -> str:
+        return ACCOUNT_NUMBER_PATTERN.findall(os.path.basename(path))[0].replace(' ', '')
@@ -1,17 +1,28 @@
-from typing import List
+from typing import List, Iterator
 
 import pandas as pd
 
+from src.data_processing.loaders.export_reader import read_export, iter_export
 from src.data_processing.loaders.loader_interface import LoaderInterface
 
 
 class NordeaLoader(LoaderInterface):
+    columns = ["Saaja/Maksaja", "Viesti", "Tapahtuma", "Määrä", "Kirjauspäivä"]
 
     def load(self, file_paths: List[str]) -> pd.DataFrame:
         raw_data_list = []
         for path in file_paths:
-            df = pd.read_csv(path, sep='\t', header=1)
-            df["Tilinumero"] = pd.read_csv(path, sep='\t', nrows=1, header=None)[1].values[0]
+            preamble, df = read_export(path, sep='\t', columns=self.columns, n_preamble_lines=1)
+            df["Tilinumero"] = preamble[0][1].strip()
             raw_data_list.append(df)
+        if len(raw_data_list) == 1:
+            return raw_data_list[0]
         data = pd.concat(raw_data_list)
         return data
+
+    def iter_chunks(self, file_paths: List[str], chunk_size: int) -> Iterator[pd.DataFrame]:
+        for path in file_paths:
+            for preamble, df in iter_export(path, sep='\t', columns=self.columns, chunk_size=chunk_size,
+                                            n_preamble_lines=1):
+                df["Tilinumero"] = preamble[0][1].strip()
+                yield df
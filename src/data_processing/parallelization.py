@@ -1,15 +1,267 @@
+import atexit
+import logging
 import os
-from concurrent.futures import ProcessPoolExecutor
-from typing import Callable
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, List, Optional, NamedTuple, Dict
 
 import numpy as np
 import pandas as pd
 
+from src.data_processing.frame_io import save_frame_columns, load_frame_columns
 
-def process_df_parallel(df: pd.DataFrame, run_func: Callable, n_tasks: int = None):
+logger = logging.getLogger(__name__)
+
+# Memory backed file system, files written there are shared memory that workers can map
+SHARED_MEMORY_DIRECTORY = "/dev/shm"
+
+SERIAL = "serial"
+THREADS = "threads"
+PROCESSES = "processes"
+AUTO = "auto"
+EXECUTION_MODES = [AUTO, SERIAL, THREADS, PROCESSES]
+
+# Cost model of ExecutionPlanner, in seconds. Work is measured in units of one row tested against one rule.
+DEFAULT_UNIT_COST = 1e-7
+MIN_ROWS_PER_TASK = 10000
+POOL_START_COST = 0.3
+PROCESS_TASK_COST = 0.02
+PUBLISH_COST_PER_VALUE = 2e-7
+THREAD_TASK_COST = 0.001
+# Part of the work that holds GIL, i.e. doesn't get faster with threads
+GIL_FRACTION = 0.7
+# Weight of the latest measurement in unit cost estimate
+UNIT_COST_SMOOTHING = 0.5
+
+_pool = None  # type: Optional[ProcessPoolExecutor]
+_thread_pool = None  # type: Optional[ThreadPoolExecutor]
+
+
+def get_pool() -> ProcessPoolExecutor:
+    """
+    Get process pool that is started on first use and kept alive for the lifetime of the process.
+    """
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor()
+    return _pool
+
+
+def get_thread_pool() -> ThreadPoolExecutor:
+    global _thread_pool
+    if _thread_pool is None:
+        _thread_pool = ThreadPoolExecutor(max_workers=os.cpu_count())
+    return _thread_pool
+
+
+def is_pool_started() -> bool:
+    return _pool is not None
+
+
+@atexit.register
+def shutdown_pool():
+    global _pool, _thread_pool
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
+    if _thread_pool is not None:
+        _thread_pool.shutdown()
+        _thread_pool = None
+
+
+class SharedFrame:
+    """
+    DataFrame published to worker processes as memory mapped column files (see frame_io.save_frame_columns). Only the
+    directory is sent to workers; they map the same pages instead of unpickling copies of data. Text columns are
+    published as categories, so workers map codes and decode only unique values.
+    """
+
+    def __init__(self, data: pd.DataFrame):
+        parent = SHARED_MEMORY_DIRECTORY if os.path.isdir(SHARED_MEMORY_DIRECTORY) else None
+        self._root = tempfile.mkdtemp(dir=parent, prefix="shared-frame-")
+        self.directory = os.path.join(self._root, "data")
+        try:
+            save_frame_columns(self.directory, _text_to_categories(data))
+        except Exception:
+            self.close()
+            raise
+
+    def __getstate__(self):
+        return {"directory": self.directory}
+
+    def __setstate__(self, state):
+        self._root = None
+        self.directory = state["directory"]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def load(self, start: int = None, stop: int = None) -> pd.DataFrame:
+        return load_frame_columns(self.directory).iloc[start:stop]
+
+    def close(self):
+        if self._root is not None:
+            shutil.rmtree(self._root, ignore_errors=True)
+            self._root = None
+
+
+def _text_to_categories(data: pd.DataFrame) -> pd.DataFrame:
+    columns = {}
+    for column in data.columns:
+        values = data[column]
+        if values.dtype == object or isinstance(values.dtype, pd.StringDtype):
+            values = values.astype(object).astype("category")
+        columns[column] = values.array
+    return pd.DataFrame(columns, index=pd.RangeIndex(data.shape[0]))
+
+
+def _run_on_rows(shared_frame: SharedFrame, start: int, stop: int, run_func: Callable):
+    return run_func(shared_frame.load(start, stop))
+
+
+def process_df_parallel(df: pd.DataFrame, run_func: Callable, n_tasks: int = None) -> List:
+    """
+    Apply run_func to consecutive row chunks of df with the long lived process pool. Data is published to workers as
+    shared memory, so results should be small, e.g. masks or codes of rows instead of copies of data.
+    @return results in the order of chunks.
+    """
     if n_tasks is None:
         n_tasks = os.cpu_count()
-    tasks = np.array_split(df, n_tasks)
-    with ProcessPoolExecutor() as executor:
-        results = executor.map(run_func, tasks)
-    return results
+    bounds = [(chunk[0], chunk[-1] + 1) if len(chunk) else (0, 0)
+              for chunk in np.array_split(np.arange(df.shape[0]), n_tasks)]
+    with SharedFrame(df) as shared_frame:
+        try:
+            return _map_rows(shared_frame, bounds, run_func)
+        except BrokenProcessPool:
+            # E.g. worker was killed; pool can't be used anymore, so start new one
+            shutdown_pool()
+            return _map_rows(shared_frame, bounds, run_func)
+
+
+def _map_rows(shared_frame: SharedFrame, bounds: list, run_func: Callable) -> List:
+    futures = [get_pool().submit(_run_on_rows, shared_frame, start, stop, run_func) for start, stop in bounds]
+    return [future.result() for future in futures]
+
+
+def process_df_threaded(df: pd.DataFrame, run_func: Callable, n_tasks: int = None) -> List:
+    """
+    Apply run_func to consecutive row chunks of df with the long lived thread pool. Chunks are views of df.
+    @return results in the order of chunks.
+    """
+    if n_tasks is None:
+        n_tasks = os.cpu_count()
+    futures = [get_thread_pool().submit(run_func, df.iloc[chunk[0]:chunk[-1] + 1] if len(chunk) else df.iloc[:0])
+               for chunk in np.array_split(np.arange(df.shape[0]), n_tasks)]
+    return [future.result() for future in futures]
+
+
+class ExecutionPlan(NamedTuple):
+    mode: str
+    n_tasks: int
+    estimated_time: float
+
+
+class ExecutionPlanner:
+    """
+    Chooses serial, threaded or process execution and number of chunks for applying function to row chunks of data.
+    Time of the work is estimated from the number of rows and rules and the cost of work measured on previous runs;
+    parallel execution is used only when the estimated saving exceeds its overhead, e.g. starting process pool.
+    """
+
+    def __init__(self, mode: str = AUTO, n_workers: int = None):
+        """
+        @param mode: One of EXECUTION_MODES; other than auto forces the mode.
+        @param n_workers: Maximum number of parallel tasks, number of CPUs by default.
+        """
+        if mode not in EXECUTION_MODES:
+            raise ValueError(f"Unknown execution mode {mode}, possible modes are {EXECUTION_MODES}")
+        self.mode = mode
+        self.n_workers = n_workers if n_workers is not None else os.cpu_count()
+        self.unit_costs = {}  # type: Dict[str, float]
+
+    def plan(self, name: str, n_rows: int, n_rules: int, n_columns: int = 1, n_tasks: int = None) -> ExecutionPlan:
+        """
+        @param name: Name of the work; cost of work is measured separately for every name.
+        @param n_rows: Number of rows.
+        @param n_rules: Number of rules every row is tested against.
+        @param n_columns: Number of columns that need to be published to worker processes.
+        @param n_tasks: Number of chunks, chosen by planner if None.
+        """
+        serial_time = n_rows * max(n_rules, 1) * self.unit_costs.get(name, DEFAULT_UNIT_COST)
+        if n_tasks is None:
+            n_tasks = min(self.n_workers, n_rows // MIN_ROWS_PER_TASK) if self.mode == AUTO else self.n_workers
+        n_tasks = max(1, min(n_tasks, n_rows))
+        estimates = {SERIAL: serial_time}
+        if n_tasks > 1:
+            estimates[THREADS] = serial_time * self._get_time_factor(THREADS, n_tasks) + THREAD_TASK_COST * n_tasks
+            estimates[PROCESSES] = serial_time * self._get_time_factor(PROCESSES, n_tasks) + \
+                self._get_process_overhead(n_rows, n_columns, n_tasks)
+        mode = min(estimates, key=estimates.get) if self.mode == AUTO else self.mode
+        if mode == SERIAL:
+            n_tasks = 1
+        return ExecutionPlan(mode, n_tasks, estimates.get(mode, serial_time))
+
+    def run(self, name: str, df: pd.DataFrame, run_func: Callable, n_rules: int, n_tasks: int = None) -> List:
+        """
+        Apply run_func to row chunks of df as planned and update the cost of work with measured time.
+        @return results in the order of chunks.
+        """
+        plan = self.plan(name, df.shape[0], n_rules, df.shape[1], n_tasks)
+        start_time = time.perf_counter()
+        if plan.mode == SERIAL:
+            results = [run_func(df)]
+        elif plan.mode == THREADS:
+            results = process_df_threaded(df, run_func, plan.n_tasks)
+        else:
+            overhead = self._get_process_overhead(df.shape[0], df.shape[1], plan.n_tasks)
+            results = process_df_parallel(df, run_func, plan.n_tasks)
+        elapsed_time = time.perf_counter() - start_time
+        logger.info(f"{name}: {df.shape[0]} rows, {n_rules} rules, {plan.mode} execution with {plan.n_tasks} tasks, "
+                    f"estimated {plan.estimated_time:.3f} s, took {elapsed_time:.3f} s")
+
+        # Time of small runs is mostly fixed costs, e.g. factorizing values, so only large runs update the cost of work
+        n_units = df.shape[0] * max(n_rules, 1)
+        if df.shape[0] >= MIN_ROWS_PER_TASK:
+            work_time = elapsed_time - (overhead if plan.mode == PROCESSES else 0)
+            unit_cost = max(work_time, 0) / self._get_time_factor(plan.mode, plan.n_tasks) / n_units
+            previous_unit_cost = self.unit_costs.get(name, DEFAULT_UNIT_COST)
+            self.unit_costs[name] = UNIT_COST_SMOOTHING * unit_cost + (1 - UNIT_COST_SMOOTHING) * previous_unit_cost
+        return results
+
+    @staticmethod
+    def _get_time_factor(mode: str, n_tasks: int) -> float:
+        # Time of parallel work relative to serial work
+        if mode == THREADS:
+            return GIL_FRACTION + (1 - GIL_FRACTION) / n_tasks
+        if mode == PROCESSES:
+            return 1 / n_tasks
+        return 1
+
+    @staticmethod
+    def _get_process_overhead(n_rows: int, n_columns: int, n_tasks: int) -> float:
+        start_cost = 0 if is_pool_started() else POOL_START_COST
+        return start_cost + PROCESS_TASK_COST * n_tasks + PUBLISH_COST_PER_VALUE * n_rows * n_columns
+
+
+def process_parallel(items: list, run_func: Callable, n_workers: int = None) -> List:
+    """
+    Apply run_func to every item with the long lived process pool. Results are returned in the same order as items.
+    @param n_workers: Items are processed serially if this or the number of items is at most one; otherwise the pool
+    uses its own number of workers.
+    """
+    if n_workers is None:
+        n_workers = os.cpu_count()
+    n_workers = min(n_workers, len(items))
+    if n_workers <= 1:
+        return [run_func(item) for item in items]
+    try:
+        return list(get_pool().map(run_func, items))
+    except BrokenProcessPool:
+        shutdown_pool()
+        return list(get_pool().map(run_func, items))
@@ -0,0 +1,270 @@
+import os
+import re
+from bisect import bisect_left
+from functools import partial
+from typing import List, Dict, Iterable
+
+import numpy as np
+import pandas as pd
+import regex
+
+from src.data_processing.parallelization import get_thread_pool
+
+REGEX_SPECIAL_CHARACTERS = set(".^$*+?{}[]\\|()")
+# Characters that re and regex modules match differently with IGNORECASE, e.g. re matches "ı" (dotless i) with "i"
+INCONSISTENT_CASE_CHARACTERS = set("\u0130\u0131\u0390\u03b0\u1fd3\u1fe3\ufb05\ufb06")
+# Escapes of character classes and word boundaries, regex module classifies e.g. combining marks and superscripts
+# differently than re
+CLASS_ESCAPE_PATTERN = re.compile(r"\\[dDsSwWbB]")
+# Values are searched in threads only if there are enough of them to pay thread overhead
+MIN_THREADED_VALUES = 20000
+THREADED_CHUNK_SIZE = 5000
+
+
+def is_literal(pattern: str) -> bool:
+    return not any(c in REGEX_SPECIAL_CHARACTERS for c in pattern)
+
+
+def is_prefix_literal(pattern: str) -> bool:
+    return pattern.startswith("^") and is_literal(pattern[1:])
+
+
+class CaseFolder:
+    """
+    Maps every character to a representative of its case insensitive equivalence class, as defined by re.IGNORECASE.
+    Literal matches case insensitively iff folded literal matches folded text exactly.
+    """
+
+    def __init__(self):
+        self._table = {}  # type: Dict[int, str]
+        self._representatives = []
+
+    def fold(self, strings: Iterable[str]) -> List[str]:
+        strings = list(strings)
+        for c in set("".join(strings)):
+            if ord(c) not in self._table:
+                self._table[ord(c)] = self._get_representative(c)
+        return [s.translate(self._table) for s in strings]
+
+    def _get_representative(self, c: str) -> str:
+        for representative, pattern in self._representatives:
+            if pattern.fullmatch(c):
+                return representative
+        self._representatives.append((c, re.compile(re.escape(c), re.IGNORECASE)))
+        return c
+
+
+_case_folder = CaseFolder()
+
+
+def split_alternatives(pattern: str) -> List[str]:
+    """
+    Split pattern to its top level alternatives, e.g. "^a|b(c|d)" -> ["^a", "b(c|d)"]. Pattern is returned as is if it
+    has inline flags or extensions, because they can apply to all alternatives.
+    """
+    if "(?" in pattern:
+        return [pattern]
+    alternatives = []
+    start = 0
+    depth = 0
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == "\\":
+            if pattern[i + 1:i + 2].isdigit():
+                # Group numbers of back references would change
+                return [pattern]
+            i += 1
+        elif c == "[":
+            # Skip character class, "]" right after "[" or "[^" is literal
+            i += 2 if pattern[i + 1:i + 2] == "^" else 1
+            if pattern[i:i + 1] == "]":
+                i += 1
+            while i < len(pattern) and pattern[i] != "]":
+                i += 2 if pattern[i] == "\\" else 1
+        elif c == "(":
+            depth += 1
+        elif c == ")":
+            depth -= 1
+        elif c == "|" and depth == 0:
+            alternatives.append(pattern[start:i])
+            start = i + 1
+        i += 1
+    alternatives.append(pattern[start:])
+    try:
+        for alternative in alternatives:
+            re.compile(alternative)
+    except re.error:
+        return [pattern]
+    return alternatives
+
+
+def contains(values: pd.Series, pattern, ignore_case: bool = True) -> np.ndarray:
+    """
+    Same as values.str.contains(pattern, flags=re.IGNORECASE if ignore_case else 0, na=False), but large inputs are
+    searched in chunks in threads with regex module. It releases GIL while matching, so threads use multiple CPU cores
+    without starting processes or copying data. The stdlib re is used when regex module could give different results.
+    @param values: Values to search.
+    @param pattern: Pattern string or compiled re pattern.
+    @param ignore_case: Ignore case, must be False for compiled pattern.
+    @return boolean mask of values that contain the pattern.
+    """
+    flags = re.IGNORECASE if ignore_case else 0
+    compiled = _compile_threaded(pattern, ignore_case) if _use_threads(values) else None
+    if compiled is None or (ignore_case and _has_inconsistent_case(values)):
+        return values.str.contains(pattern, flags=flags, na=False).to_numpy(dtype=bool)
+    items = values.tolist()
+    chunks = [items[i:i + THREADED_CHUNK_SIZE] for i in range(0, len(items), THREADED_CHUNK_SIZE)]
+    results = list(get_thread_pool().map(partial(_search_chunk, compiled), chunks))
+    return np.concatenate(results)
+
+
+def _use_threads(values: pd.Series) -> bool:
+    return len(values) >= MIN_THREADED_VALUES and (os.cpu_count() or 1) > 1
+
+
+def _compile_threaded(pattern, ignore_case: bool):
+    pattern_string = pattern.pattern if isinstance(pattern, re.Pattern) else pattern
+    # Validate pattern with re, so that errors are the same in both cases
+    re.compile(pattern_string, re.IGNORECASE if ignore_case else 0)
+    # regex module interprets POSIX character classes, re doesn't
+    if "[:" in pattern_string or CLASS_ESCAPE_PATTERN.search(pattern_string) or \
+            (ignore_case and INCONSISTENT_CASE_CHARACTERS.intersection(pattern_string)):
+        return None
+    try:
+        return regex.compile(pattern_string, (regex.IGNORECASE if ignore_case else 0) | regex.VERSION0)
+    except regex.error:
+        return None
+
+
+def _has_inconsistent_case(values: pd.Series) -> bool:
+    return any(isinstance(value, str) and not INCONSISTENT_CASE_CHARACTERS.isdisjoint(value) for value in values)
+
+
+def _search_chunk(compiled, values: list) -> np.ndarray:
+    return np.array([isinstance(value, str) and compiled.search(value, concurrent=True) is not None
+                     for value in values], dtype=bool)
+
+
+def match_patterns(uniques: pd.Series, patterns: List[str]) -> np.ndarray:
+    """
+    Match many patterns (see data_filtering.string_filter) against unique values of a column. Patterns are grouped
+    so that the column is scanned once per group instead of once per pattern: literals with single trie regex, literals
+    anchored to start with binary search over sorted values and other patterns are prefiltered with their alternation.
+    Top level alternatives of patterns are matched separately, so e.g. "^abc|def" is matched with the fast methods.
+    @param uniques: Unique values of the column.
+    @param patterns: Patterns.
+    @return boolean matrix (uniques x patterns) that tells which patterns match which values.
+    """
+    stripped = [pattern.strip() for pattern in patterns]
+    alternatives = {pattern: split_alternatives(pattern) for pattern in stripped}
+    distinct = list(dict.fromkeys(a for pattern in alternatives.values() for a in pattern))
+    is_string = uniques.map(type).eq(str).to_numpy()
+    strings = uniques[is_string].tolist()
+
+    literals = [p for p in distinct if is_literal(p)]
+    prefixes = [p for p in distinct if p not in literals and is_prefix_literal(p)]
+    regexes = [p for p in distinct if p not in literals and p not in prefixes]
+
+    result = {}
+    if literals or prefixes:
+        folded_strings = _case_folder.fold(strings)
+        string_positions = np.flatnonzero(is_string)
+        for matched_patterns, match in [(literals, _match_substrings), (prefixes, _match_prefixes)]:
+            if not matched_patterns:
+                continue
+            folded_patterns = _case_folder.fold([p.lstrip("^") for p in matched_patterns])
+            string_matches = match(folded_strings, folded_patterns)
+            for j, pattern in enumerate(matched_patterns):
+                mask = np.zeros(len(uniques), dtype=bool)
+                mask[string_positions] = string_matches[:, j]
+                result[pattern] = mask
+    if regexes:
+        regex_matches = _match_regexes(uniques, regexes)
+        for j, pattern in enumerate(regexes):
+            result[pattern] = regex_matches[:, j]
+
+    if len(patterns) == 0:
+        return np.zeros((len(uniques), 0), dtype=bool)
+    return np.column_stack([np.logical_or.reduce([result[a] for a in alternatives[pattern]]) for pattern in stripped])
+
+
+def _match_substrings(strings: List[str], literals: List[str]) -> np.ndarray:
+    matches = np.zeros((len(strings), len(literals)), dtype=bool)
+    literal_indices = {literal: j for j, literal in enumerate(literals)}
+    # Every literal matches also all the literals it contains
+    contained_indices = [[j for j, other in enumerate(literals) if other in literal] for literal in literals]
+    if "" in literal_indices:
+        matches[:, literal_indices[""]] = True
+    non_empty = [literal for literal in literals if literal != ""]
+    if not non_empty:
+        return matches
+
+    # Trie regex finds the longest literal starting at given position in time that doesn't depend on number of literals
+    pattern = re.compile(_get_trie_regex(non_empty))
+    has_match = contains(pd.Series(strings, dtype=object), pattern, ignore_case=False)
+    for i in np.flatnonzero(has_match):
+        text = strings[i]
+        match = pattern.search(text)
+        while match is not None:
+            matches[i, contained_indices[literal_indices[match.group()]]] = True
+            match = pattern.search(text, match.start() + 1)
+    return matches
+
+
+def _get_trie_regex(literals: List[str]) -> str:
+    trie = {}
+    for literal in literals:
+        node = trie
+        for c in literal:
+            node = node.setdefault(c, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        branches = [re.escape(c) + build(child) for c, child in sorted(node.items()) if c != ""]
+        if not branches:
+            return ""
+        expression = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            # Greedy optional group, so that the longest literal is matched
+            expression = "(?:" + expression + ")?"
+        return expression
+
+    return build(trie)
+
+
+def _match_prefixes(strings: List[str], prefixes: List[str]) -> np.ndarray:
+    matches = np.zeros((len(strings), len(prefixes)), dtype=bool)
+    order = sorted(range(len(strings)), key=strings.__getitem__)
+    sorted_strings = [strings[i] for i in order]
+    order = np.array(order, dtype=np.int64)
+    for j, prefix in enumerate(prefixes):
+        if prefix == "":
+            matches[:, j] = True
+            continue
+        start = bisect_left(sorted_strings, prefix)
+        if ord(prefix[-1]) < 0x10FFFF:
+            end = bisect_left(sorted_strings, prefix[:-1] + chr(ord(prefix[-1]) + 1), lo=start)
+        else:
+            end = start
+            while end < len(sorted_strings) and sorted_strings[end].startswith(prefix):
+                end += 1
+        matches[order[start:end], j] = True
+    return matches
+
+
+def _match_regexes(uniques: pd.Series, regexes: List[str]) -> np.ndarray:
+    matches = np.zeros((len(uniques), len(regexes)), dtype=bool)
+    candidates = np.arange(len(uniques))
+    # Alternation of patterns finds values that match any pattern; it can't be used if patterns have groups,
+    # because numbering of back references would change
+    if len(regexes) > 1 and all(re.compile(pattern, re.IGNORECASE).groups == 0 for pattern in regexes):
+        try:
+            alternation = re.compile("|".join(f"(?:{pattern})" for pattern in regexes), re.IGNORECASE)
+            candidates = np.flatnonzero(contains(uniques, alternation.pattern))
+        except re.error:
+            pass
+    candidate_values = uniques.iloc[candidates]
+    for j, pattern in enumerate(regexes):
+        matches[candidates, j] = contains(candidate_values, pattern)
+    return matches
@@ -0,0 +1,200 @@
+import hashlib
+import json
+from collections import OrderedDict
+from typing import List, Dict, Callable, Tuple, Any, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.data_processing.data_filtering import FILTER_MASKS, FactorizedStrings, string_mask
+from src.data_processing.labels import LabelSet
+
+Predicate = Tuple[Callable[[pd.Series, Any], np.ndarray], str, Any]
+
+# Maximum total number of row positions in RuleMatchCache
+MAX_CACHED_POSITIONS = 20000000
+
+
+class Rule:
+    """
+    Named set of filter values (see data_filtering.filter_data), compiled to column predicates.
+    """
+
+    def __init__(self, name: str, filter_values: dict):
+        self.name = name
+        self.hash = get_rule_hash(filter_values)
+        self.predicates = []  # type: List[Predicate]
+        for key in filter_values:
+            if key not in FILTER_MASKS:
+                raise TypeError(f"Rule {name} has unknown filter {key}")
+        # Predicates are evaluated in the order of filter_data: cheap comparisons first, then regular expressions
+        for key, (mask_function, column) in FILTER_MASKS.items():
+            if filter_values.get(key) is not None:
+                self.predicates.append((mask_function, column, filter_values[key]))
+
+    @property
+    def columns(self) -> List[str]:
+        """
+        Columns used by the rule.
+        """
+        return list(dict.fromkeys(column for _, column, _ in self.predicates))
+
+    def match(self, data: pd.DataFrame, positions: np.ndarray = None, strings: FactorizedStrings = None) \
+            -> np.ndarray:
+        """
+        Get positions of rows that match all the predicates.
+        @param data: Data.
+        @param positions: Positions of rows to test, all rows if None.
+        @param strings: Factorized string columns of data, shared between rules.
+        @return positions of matching rows.
+        """
+        if positions is None:
+            positions = np.arange(data.shape[0])
+        if strings is None:
+            strings = FactorizedStrings(data)
+        for mask_function, column, value in self.predicates:
+            if len(positions) == 0:
+                break
+            if mask_function is string_mask:
+                positions = positions[strings.mask(column, value, positions)]
+                continue
+            values = data[column]
+            if len(positions) < len(values):
+                values = values.iloc[positions]
+            positions = positions[mask_function(values, value)]
+        return positions
+
+
+def get_rule_hash(filter_values: dict) -> str:
+    """
+    Hash of rule filter values; rules with equal filter values match same rows regardless of their names.
+    """
+    return hashlib.md5(json.dumps(filter_values, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class RuleMatchCache:
+    """
+    Positions of rows that match rules, cached by rule hash and fingerprint of the rule columns of data (see
+    dataset.Dataset.get_fingerprint). When one rule is added, edited or removed, only that rule needs to be evaluated
+    and precedence of rules is resolved from cached positions. Least recently used positions are dropped when the
+    cache is full.
+    """
+
+    def __init__(self, max_positions: int = MAX_CACHED_POSITIONS):
+        self.max_positions = max_positions
+        self._positions = OrderedDict()  # type: OrderedDict[Tuple[str, str], np.ndarray]
+        self._n_positions = 0
+
+    def get(self, rule_hash: str, fingerprint: str) -> Optional[np.ndarray]:
+        positions = self._positions.get((rule_hash, fingerprint))
+        if positions is not None:
+            self._positions.move_to_end((rule_hash, fingerprint))
+        return positions
+
+    def put(self, rule_hash: str, fingerprint: str, positions: np.ndarray):
+        key = (rule_hash, fingerprint)
+        if key in self._positions:
+            self._n_positions -= len(self._positions.pop(key))
+        self._positions[key] = positions
+        self._n_positions += len(positions)
+        while self._n_positions > self.max_positions and len(self._positions) > 1:
+            _, removed = self._positions.popitem(last=False)
+            self._n_positions -= len(removed)
+
+    def __len__(self):
+        return len(self._positions)
+
+
+class RuleSet:
+    """
+    Categories or labels configuration compiled to rules. Rules are compiled once and evaluated as masks over the
+    columns of data, without copying data.
+    """
+
+    def __init__(self, specifications: Dict[str, dict]):
+        self.rules = [Rule(name, filter_values) for name, filter_values in specifications.items()]
+        self.string_patterns = {}  # type: Dict[str, List[str]]
+        for rule in self.rules:
+            for mask_function, column, value in rule.predicates:
+                if mask_function is string_mask:
+                    self.string_patterns.setdefault(column, []).append(value)
+
+    def _factorize_strings(self, data: pd.DataFrame) -> FactorizedStrings:
+        # Patterns of all rules are matched together, one scan over unique values per column
+        strings = FactorizedStrings(data)
+        for column, patterns in self.string_patterns.items():
+            strings.match_unique_values(column, patterns)
+        return strings
+
+    @property
+    def columns(self) -> List[str]:
+        """
+        Columns used by the rules.
+        """
+        return list(dict.fromkeys(column for rule in self.rules for column in rule.columns))
+
+    def categorize(self, data: pd.DataFrame, default: str = "Other") -> np.ndarray:
+        """
+        Get category of every row. If row matches multiple rules, the last one is used.
+        @return categories as object array.
+        """
+        return self.categories_from_codes(self.get_category_codes(data), default)
+
+    def get_category_codes(self, data: pd.DataFrame) -> np.ndarray:
+        """
+        Get index of the rule that gives category for every row, -1 if no rule matches. Rules are evaluated in reverse
+        order so that every rule is tested only against rows that don't have category yet.
+        """
+        codes = np.full(data.shape[0], -1, dtype=np.int32)
+        is_unassigned = np.ones(data.shape[0], dtype=bool)
+        strings = self._factorize_strings(data)
+        for i in reversed(range(len(self.rules))):
+            matched = self.rules[i].match(data, np.flatnonzero(is_unassigned), strings)
+            codes[matched] = i
+            is_unassigned[matched] = False
+            if not is_unassigned.any():
+                break
+        return codes
+
+    def categories_from_codes(self, codes: np.ndarray, default: str = "Other") -> np.ndarray:
+        names = np.array([rule.name for rule in self.rules] + [default], dtype=object)
+        # Code -1 takes the last item, i.e. default
+        return names[codes]
+
+    def category_codes_from_positions(self, positions: List[np.ndarray], n_rows: int) -> np.ndarray:
+        """
+        Get category codes (see get_category_codes) from positions of rows that match every rule.
+        """
+        codes = np.full(n_rows, -1, dtype=np.int32)
+        # Later rules override earlier ones
+        for i, rule_positions in enumerate(positions):
+            codes[rule_positions] = i
+        return codes
+
+    def masks_from_positions(self, positions: List[np.ndarray], n_rows: int) -> np.ndarray:
+        masks = np.zeros((n_rows, len(self.rules)), dtype=bool)
+        for i, rule_positions in enumerate(positions):
+            masks[rule_positions, i] = True
+        return masks
+
+    def get_masks(self, data: pd.DataFrame) -> np.ndarray:
+        """
+        @return boolean matrix (rows x rules) that tells which rows match which rules.
+        """
+        masks = np.zeros((data.shape[0], len(self.rules)), dtype=bool)
+        strings = self._factorize_strings(data)
+        for i, rule in enumerate(self.rules):
+            masks[rule.match(data, strings=strings), i] = True
+        return masks
+
+    def extract_labels(self, data: pd.DataFrame) -> List[List[str]]:
+        """
+        Get labels of every row, in the order of rules.
+        """
+        return self.labels_from_masks(self.get_masks(data))
+
+    def labels_from_masks(self, masks: np.ndarray) -> List[List[str]]:
+        return self.get_label_set(masks).to_lists()
+
+    def get_label_set(self, masks: np.ndarray) -> LabelSet:
+        return LabelSet.from_masks([rule.name for rule in self.rules], masks)
@@ -0,0 +1,87 @@
+import glob
+import os
+import shutil
+from typing import Iterator, List, Dict
+
+import pandas as pd
+
+from src.data_processing.data_preprocessing import DataPreprocessor
+from src.data_processing.frame_io import save_frame, load_frame
+
+
+class ChunkStore:
+    """
+    On-disk store for processed chunks, see DataPreprocessor.iter_data. Every chunk is written to its own file, so
+    writing needs memory only for one chunk.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def clear(self) -> None:
+        shutil.rmtree(self.directory)
+        os.makedirs(self.directory)
+
+    def append(self, chunk: pd.DataFrame) -> None:
+        n_parts = len(self._get_part_paths())
+        save_frame(os.path.join(self.directory, f"part-{n_parts:06d}.npz"), chunk)
+
+    def iter_chunks(self) -> Iterator[pd.DataFrame]:
+        for path in self._get_part_paths():
+            yield load_frame(path)
+
+    def load(self) -> pd.DataFrame:
+        """
+        Load all the chunks as one DataFrame sorted by time, with duplicate flags added.
+        """
+        chunks = list(self.iter_chunks())
+        if len(chunks) == 0:
+            return pd.DataFrame()
+        data = pd.concat(chunks).sort_values("time", kind="stable")
+        DataPreprocessor.add_is_duplicate(data)
+        return data
+
+    def _get_part_paths(self) -> List[str]:
+        return sorted(glob.glob(os.path.join(self.directory, "part-*.npz")))
+
+
+class AggregateReducer:
+    """
+    Reduce processed chunks to sums and counts of values grouped by given columns, e.g. monthly sums per category.
+    """
+
+    def __init__(self, group_by: List[str] = ("year", "month", "category"), drop_data: Dict[str, list] = None):
+        self.group_by = list(group_by)
+        self.drop_data = drop_data
+        self._result = None
+
+    def append(self, chunk: pd.DataFrame) -> None:
+        if self.drop_data:
+            chunk, _ = DataPreprocessor.drop_rows(chunk, self.drop_data)
+        aggregated = chunk.groupby(self.group_by, observed=True)["value"].agg(["sum", "count"])
+        if self._result is None:
+            self._result = aggregated
+        else:
+            self._result = self._result.add(aggregated, fill_value=0)
+
+    def get_result(self) -> pd.DataFrame:
+        if self._result is None:
+            return pd.DataFrame(columns=["sum", "count"])
+        result = self._result.sort_index()
+        result["count"] = result["count"].astype(int)
+        return result
+
+
+def process_in_chunks(data_processor: DataPreprocessor,
+                      file_paths: List[str],
+                      config: dict,
+                      sinks: list,
+                      chunk_size: int = None) -> None:
+    """
+    Process files in chunks and pass every processed chunk to all the sinks, e.g. ChunkStore and AggregateReducer.
+    """
+    kwargs = {} if chunk_size is None else {"chunk_size": chunk_size}
+    for chunk in data_processor.iter_data(file_paths, config, **kwargs):
+        for sink in sinks:
+            sink.append(chunk)
@@ -0,0 +1,202 @@
+import glob
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import uuid
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.config_manager import CATEGORIES_KEY, LABELS_KEY, NOTES_KEY
+from src.data_processing.cache import get_file_hash
+from src.data_processing.data_preprocessing import DataPreprocessor
+from src.data_processing.frame_io import save_frame_columns, load_frame_columns
+from src.data_processing.validation import validate, DEFAULT_SAMPLE_SIZE
+from src.utils import load_json, save_json
+
+logger = logging.getLogger(__name__)
+
+# Bump this when format of stored data changes; store is rebuilt when version does not match
+STORE_VERSION = 3
+SOURCE_COLUMN = "source"
+DERIVED_COLUMNS = ["category", "labels"]
+
+
+def get_rules_fingerprint(config: dict) -> str:
+    rules = {CATEGORIES_KEY: config.get(CATEGORIES_KEY), LABELS_KEY: config.get(LABELS_KEY)}
+    return hashlib.md5(json.dumps(rules, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class TransactionStore:
+    """
+    Persistent, time sorted store of processed transactions.
+
+    Store keeps track of the files it has ingested. When data is requested for a list of files, only new and changed
+    files are loaded, and only rows with ids not already in the store are categorized and labelled; categories and
+    labels of known rows are reused as long as category and label rules are unchanged. Rows of files that are not in
+    the list anymore are removed.
+
+    Data is stored as one file per column and it's memory mapped when loaded, so numeric columns are not read to
+    memory before they are used and several processes can share them. Every update is written to a new data directory
+    and manifest is switched to point to it, so readers always see complete data.
+    """
+    DATA_DIRECTORY_PREFIX = "data-"
+    MANIFEST_FILE = "manifest.json"
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def ingest(self, data_processor: DataPreprocessor, file_paths: List[str], config: dict) -> pd.DataFrame:
+        """
+        Update the store to contain data of the given files and return all the data in the store.
+        @param data_processor: Data processor used to load and process new data.
+        @param file_paths: List of file paths.
+        @param config: Configuration.
+        @return processed data, sorted by time.
+        """
+        manifest = self._load_manifest()
+        stored_data = self._load_data(manifest)
+        file_entries = {os.path.abspath(path): self._get_file_entry(path, manifest["files"].get(os.path.abspath(path)))
+                        for path in file_paths}
+        unchanged_sources = [source for source, entry in file_entries.items() if
+                             manifest["files"].get(source, {}).get("hash") == entry["hash"]]
+        new_paths = [path for path in file_paths if os.path.abspath(path) not in unchanged_sources]
+        rules_fingerprint = get_rules_fingerprint(config)
+        rules_changed = manifest.get("rules") != rules_fingerprint
+        logger.info(f"Store contains {len(unchanged_sources)} unchanged files, loading {len(new_paths)} files")
+
+        if stored_data is None:
+            stored_data = pd.DataFrame()
+            kept_data = pd.DataFrame()
+        else:
+            is_kept = stored_data[SOURCE_COLUMN].isin(unchanged_sources).to_numpy()
+            if len(new_paths) == 0 and not rules_changed and is_kept.all():
+                # Nothing has changed, use memory mapped data as it is
+                manifest["files"] = file_entries
+                self._save_manifest(manifest)
+                del stored_data[SOURCE_COLUMN]
+                data_processor.add_notes(stored_data, config.get(NOTES_KEY))
+                return stored_data
+            kept_data = stored_data[is_kept].copy()
+
+        new_data = self._load_new_data(data_processor, new_paths)
+        if new_data is not None:
+            self._add_derived_columns(data_processor, new_data, stored_data, config, reuse=not rules_changed)
+        if rules_changed and not kept_data.empty:
+            self._add_derived_columns(data_processor, kept_data, stored_data, config, reuse=False)
+
+        data_list = [d for d in [kept_data, new_data] if d is not None and not d.empty]
+        if len(data_list) == 0:
+            data = pd.DataFrame()
+        else:
+            data = pd.concat(data_list).sort_values("time", kind="stable").reset_index(drop=True)
+            if config.get(LABELS_KEY) is not None:
+                # Same layout as DataPreprocessor.add_labels, one display string per combination of labels
+                data["labels"] = data["labels"].astype("category").cat.remove_unused_categories()
+            data_processor.add_notes(data, config.get(NOTES_KEY))
+            data_processor.add_is_duplicate(data)
+            data = data_processor.apply_layout(data)
+
+        data_directory = self._save_data(data)
+        self._save_manifest({"version": STORE_VERSION, "data": data_directory, "files": file_entries,
+                             "rules": rules_fingerprint})
+        self._remove_unused_data(data_directory)
+        return data.drop(columns=SOURCE_COLUMN, errors="ignore")
+
+    def load(self) -> pd.DataFrame:
+        """
+        Get data in the store without updating it, e.g. for reports.
+        @return processed data, sorted by time.
+        """
+        data = self._load_data(self._load_manifest())
+        if data is None:
+            return pd.DataFrame()
+        del data[SOURCE_COLUMN]
+        return data
+
+    @staticmethod
+    def _load_new_data(data_processor: DataPreprocessor, paths: List[str]) -> Optional[pd.DataFrame]:
+        if len(paths) == 0:
+            return None
+        data_list = data_processor.load_and_transform_files(paths)
+        data = pd.concat(data_list, ignore_index=True)
+        validate(data, sample_size=DEFAULT_SAMPLE_SIZE)
+        sources = [os.path.abspath(path) for path in paths]
+        data[SOURCE_COLUMN] = np.repeat(sources, [d.shape[0] for d in data_list]).astype(object)
+        return data_processor.preprocess_data(data)
+
+    @staticmethod
+    def _add_derived_columns(data_processor: DataPreprocessor, data: pd.DataFrame, stored_data: pd.DataFrame,
+                             config: dict, reuse: bool) -> None:
+        if reuse and not stored_data.empty:
+            known = stored_data.drop_duplicates("key").set_index("key")
+            is_known = data["key"].isin(known.index).values
+        else:
+            is_known = np.zeros(data.shape[0], dtype=bool)
+        for column in DERIVED_COLUMNS:
+            data[column] = ""
+        if is_known.any():
+            for column in DERIVED_COLUMNS:
+                data.loc[is_known, column] = data.loc[is_known, "key"].map(known[column]).values
+        if not is_known.all():
+            unknown_data = data.loc[~is_known].copy()
+            logger.info(f"Categorizing {unknown_data.shape[0]} new rows")
+            data_processor.add_categories(unknown_data, config.get(CATEGORIES_KEY))
+            data_processor.add_labels(unknown_data, config.get(LABELS_KEY))
+            for column in DERIVED_COLUMNS:
+                data.loc[~is_known, column] = np.asarray(unknown_data[column])
+
+    @staticmethod
+    def _get_file_entry(path: str, previous_entry: Optional[dict]) -> dict:
+        stat = os.stat(path)
+        entry = {"size": stat.st_size, "mtime": stat.st_mtime_ns}
+        if previous_entry is not None and all(previous_entry.get(k) == v for k, v in entry.items()):
+            # Content hash is computed only for files that have been modified
+            entry["hash"] = previous_entry["hash"]
+        else:
+            entry["hash"] = get_file_hash(path)
+        return entry
+
+    def _load_data(self, manifest: dict) -> Optional[pd.DataFrame]:
+        """
+        @return stored data, or None if there is no stored data; ingesting no rows stores a frame without columns.
+        """
+        if manifest.get("data") is None:
+            return None
+        data = load_frame_columns(os.path.join(self.directory, manifest["data"]))
+        if data.shape[0] == 0 or SOURCE_COLUMN not in data.columns:
+            return None
+        return data
+
+    def _save_data(self, data: pd.DataFrame) -> str:
+        data_directory = f"{self.DATA_DIRECTORY_PREFIX}{uuid.uuid4().hex}"
+        save_frame_columns(os.path.join(self.directory, data_directory), data)
+        return data_directory
+
+    def _remove_unused_data(self, data_directory: str) -> None:
+        # Processes that have mapped removed files can still use them
+        for path in glob.glob(os.path.join(self.directory, f"{self.DATA_DIRECTORY_PREFIX}*")):
+            if os.path.basename(path) != data_directory:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def _load_manifest(self) -> dict:
+        path = os.path.join(self.directory, self.MANIFEST_FILE)
+        if not os.path.exists(path):
+            return {"files": {}, "rules": None}
+        manifest = load_json(path)
+        if manifest.get("version") != STORE_VERSION or \
+                not os.path.isdir(os.path.join(self.directory, manifest.get("data", ""))):
+            logger.info("Store was created by another version or its data is missing, rebuilding it")
+            return {"files": {}, "rules": None}
+        return manifest
+
+    def _save_manifest(self, manifest: dict) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        os.close(fd)
+        save_json(tmp_path, manifest)
+        os.replace(tmp_path, os.path.join(self.directory, self.MANIFEST_FILE))
@@ -1,8 +1,7 @@
-from datetime import datetime, date
-
 import numpy as np
 import pandas as pd
 
+from src.data_processing.transformers.parsing import parse_amounts, parse_dates
 from src.data_processing.transformers.transformer_interface import TransformerInterface
 
 
@@ -15,11 +14,10 @@ class NewNordeaTransformer(TransformerInterface):
     }
 
     def transform(self, data: pd.DataFrame) -> pd.DataFrame:
-        transformed_data = pd.DataFrame()
-        for col_target, col_source in self.mapping.items():
-            transformed_data[col_target] = data[col_source]
-        transformed_data["value"] = pd.to_numeric(transformed_data["value"].str.replace(',', '.'))
-        transformed_data["time"] = pd.to_datetime(transformed_data["time"], errors="coerce", format='%Y/%m/%d')
+        transformed_data = pd.DataFrame({col_target: data[col_source]
+                                         for col_target, col_source in self.mapping.items()})
+        transformed_data["value"] = parse_amounts(transformed_data["value"])
+        transformed_data["time"] = parse_dates(transformed_data["time"], '%Y/%m/%d')
         transformed_data["message"] = np.nan
         transformed_data["event"] = np.nan
         transformed_data["bank"] = "Nordea (new format)"
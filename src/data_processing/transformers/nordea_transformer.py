@@ -1,8 +1,6 @@
-from datetime import datetime
-
-import numpy as np
 import pandas as pd
 
+from src.data_processing.transformers.parsing import parse_amounts, parse_dates
 from src.data_processing.transformers.transformer_interface import TransformerInterface
 
 
@@ -17,13 +15,9 @@ class NordeaTransformer(TransformerInterface):
     }
 
     def transform(self, data: pd.DataFrame) -> pd.DataFrame:
-        transformed_data = pd.DataFrame()
-        for col_target, col_source in self.mapping.items():
-            transformed_data[col_target] = data[col_source]
-        transformed_data["value"] = pd.to_numeric(transformed_data["value"].str.replace(',', '.'))
-        transformed_data["time"] = transformed_data["time"].astype(str)
-        transformed_data["time"] = pd.to_datetime(transformed_data["time"], errors="coerce", format='%d.%m.%Y')
+        transformed_data = pd.DataFrame({col_target: data[col_source]
+                                         for col_target, col_source in self.mapping.items()})
+        transformed_data["value"] = parse_amounts(transformed_data["value"])
+        transformed_data["time"] = parse_dates(transformed_data["time"], '%d.%m.%Y')
         transformed_data["bank"] = "Nordea (old format)"
         return transformed_data
-
-
@@ -0,0 +1,199 @@
+import re
+from functools import partial
+from typing import Tuple, Dict, List, Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+MAX_AMOUNT_DIGITS = 15
+# Years that fit to datetime64[ns], other years are left for pandas
+MIN_YEAR = 1678
+MAX_YEAR = 2261
+
+_DIGIT_0 = ord("0")
+_DIGIT_9 = ord("9")
+_COMMA = ord(",")
+_DOT = ord(".")
+_MINUS = ord("-")
+_PLUS = ord("+")
+
+_DATE_FIELD_WIDTHS = {"%d": 2, "%m": 2, "%Y": 4}
+
+
+def _to_code_points(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Convert array of strings to matrix of unicode code points (n_values x max_length), padded with zeros.
+    """
+    fixed_width = values.astype(str)
+    width = max(fixed_width.dtype.itemsize // 4, 1)
+    chars = np.ascontiguousarray(fixed_width).view(np.uint32).reshape(len(values), -1) if len(values) else \
+        np.zeros((0, width), dtype=np.uint32)
+    lengths = (chars != 0).sum(axis=1)
+    return chars, lengths
+
+
+def _is_digit(chars: np.ndarray) -> np.ndarray:
+    return (chars >= _DIGIT_0) & (chars <= _DIGIT_9)
+
+
+def _to_number(chars: np.ndarray) -> np.ndarray:
+    """
+    Convert matrix of digit code points to integers, one per row.
+    """
+    number = np.zeros(chars.shape[0], dtype=np.int64)
+    for i in range(chars.shape[1]):
+        number = number * 10 + (chars[:, i].astype(np.int64) - _DIGIT_0)
+    return number
+
+
+def _string_mask(values: pd.Series) -> np.ndarray:
+    is_not_null = values.notna().to_numpy()
+    if values.dtype != object or pd.api.types.infer_dtype(values, skipna=True) in ["string", "empty"]:
+        return is_not_null
+    return values.map(type).eq(str).to_numpy()
+
+
+def _parse_unique_values(values: pd.Series, parse: Callable[[pd.Series], Tuple[np.ndarray, np.ndarray]],
+                         fill_value) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Parse only unique values and broadcast the results back to all the values; useful for dates that repeat a lot.
+    """
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    parsed, is_valid = parse(pd.Series(uniques))
+    if len(uniques) == 0:
+        return np.full(len(codes), fill_value, dtype=parsed.dtype), np.zeros(len(codes), dtype=bool)
+    is_valid = (codes >= 0) & is_valid.take(codes)
+    return np.where(is_valid, parsed.take(codes), fill_value), is_valid
+
+
+def parse_cents(values: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Parse amounts in Finnish format (e.g. "-1234,5") to integer cents with vectorized operations over code points.
+    Amounts need to consist of optional sign, digits and optional decimal separator (comma or dot) followed by at most
+    two decimals.
+    @param values: Amounts as strings.
+    @return cents, mask of values that could be parsed.
+    """
+    is_string = _string_mask(values)
+    strings = np.where(is_string, values.to_numpy(dtype=object), "")
+    chars, lengths = _to_code_points(strings)
+    if chars.shape[0] == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=bool)
+
+    is_digit = _is_digit(chars)
+    is_separator = (chars == _COMMA) | (chars == _DOT)
+    has_sign = (chars[:, 0] == _MINUS) | (chars[:, 0] == _PLUS)
+    is_negative = chars[:, 0] == _MINUS
+    positions = np.arange(chars.shape[1])
+    is_char = positions < lengths[:, None]
+
+    is_allowed = is_digit | is_separator | ((positions == 0) & has_sign[:, None]) | ~is_char
+    n_separators = is_separator.sum(axis=1)
+    n_digits = is_digit.sum(axis=1)
+    separator_position = np.where(n_separators == 1, is_separator.argmax(axis=1), lengths)
+    n_decimals = np.where(n_separators == 1, lengths - separator_position - 1, 0)
+    is_valid = is_string & is_allowed.all(axis=1) & (n_separators <= 1) & (n_decimals <= 2) & \
+        (n_digits >= 1) & (n_digits <= MAX_AMOUNT_DIGITS)
+
+    accumulated = np.zeros(chars.shape[0], dtype=np.int64)
+    for i in range(chars.shape[1]):
+        digit = chars[:, i].astype(np.int64) - _DIGIT_0
+        accumulated = np.where(is_digit[:, i], accumulated * 10 + digit, accumulated)
+    cents = accumulated * 10 ** (2 - np.clip(n_decimals, 0, 2))
+    cents = np.where(is_negative, -cents, cents)
+    return np.where(is_valid, cents, 0), is_valid
+
+
+def amounts_to_cents(amounts: np.ndarray) -> Optional[np.ndarray]:
+    """
+    Convert amounts to integer cents.
+    @return cents, or None if some amount is not whole cents (e.g. it's an average or missing).
+    """
+    cents = np.round(amounts * 100)
+    if not np.all(cents / 100 == amounts):
+        return None
+    return cents.astype(np.int64)
+
+
+def parse_amounts(values: pd.Series) -> pd.Series:
+    """
+    Parse amounts in Finnish format to floats. Values that don't match the fast path format are parsed with pandas.
+    """
+    if not (values.dtype == object or isinstance(values.dtype, pd.StringDtype)):
+        return pd.to_numeric(values).astype(float)
+    cents, is_valid = parse_cents(values)
+    amounts = pd.Series(cents / 100, index=values.index)
+    if not is_valid.all():
+        amounts[~is_valid] = pd.to_numeric(values[~is_valid].str.replace(',', '.'))
+    return amounts
+
+
+def _parse_date_format(date_format: str) -> Tuple[Dict[str, slice], List[Tuple[int, int]], int]:
+    """
+    Get positions of fields and separators for fixed width date format.
+    """
+    field_slices = {}
+    separators = []
+    position = 0
+    for token in re.findall("%.|.", date_format, re.DOTALL):
+        if token.startswith("%"):
+            if token not in _DATE_FIELD_WIDTHS or token in field_slices:
+                raise ValueError(f"Date format {date_format} is not supported by fast date parsing")
+            field_slices[token] = slice(position, position + _DATE_FIELD_WIDTHS[token])
+            position += _DATE_FIELD_WIDTHS[token]
+        else:
+            separators.append((position, ord(token)))
+            position += 1
+    if len(field_slices) != len(_DATE_FIELD_WIDTHS):
+        raise ValueError(f"Date format {date_format} is not supported by fast date parsing")
+    return field_slices, separators, position
+
+
+def parse_date_days(values: pd.Series, date_format: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Parse dates with fixed width format (zero padded %d, %m and %Y with any separators, e.g. "%d.%m.%Y") to
+    datetime64[D] with vectorized operations over code points.
+    @param values: Dates as strings.
+    @param date_format: Date format.
+    @return dates, mask of values that could be parsed.
+    """
+    return _parse_unique_values(values, partial(_parse_date_days, date_format=date_format), np.datetime64("NaT"))
+
+
+def _parse_date_days(values: pd.Series, date_format: str) -> Tuple[np.ndarray, np.ndarray]:
+    field_slices, separators, length = _parse_date_format(date_format)
+    is_string = _string_mask(values)
+    strings = np.where(is_string, values.to_numpy(dtype=object), "")
+    chars, lengths = _to_code_points(strings)
+    if chars.shape[0] == 0 or chars.shape[1] < length:
+        return np.full(chars.shape[0], np.datetime64("NaT"), dtype="M8[D]"), np.zeros(chars.shape[0], dtype=bool)
+
+    chars = chars[:, :length]
+    is_digit = _is_digit(chars)
+    is_valid = is_string & (lengths == length)
+    fields = {}
+    for token, field_slice in field_slices.items():
+        is_valid &= is_digit[:, field_slice].all(axis=1)
+        fields[token] = np.where(is_valid, _to_number(chars[:, field_slice]), 0)
+    for position, separator in separators:
+        is_valid &= chars[:, position] == separator
+
+    years, months, days = fields["%Y"], fields["%m"], fields["%d"]
+    is_valid &= (months >= 1) & (months <= 12) & (days >= 1) & (years >= MIN_YEAR) & (years <= MAX_YEAR)
+    month_starts = ((np.where(is_valid, years, 1970) - 1970) * 12 + np.where(is_valid, months, 1) - 1).astype("M8[M]")
+    days_in_month = ((month_starts + 1).astype("M8[D]") - month_starts.astype("M8[D]")).astype(np.int64)
+    is_valid &= days <= days_in_month
+    dates = month_starts.astype("M8[D]") + np.where(is_valid, days - 1, 0).astype("m8[D]")
+    return np.where(is_valid, dates, np.datetime64("NaT")), is_valid
+
+
+def parse_dates(values: pd.Series, date_format: str) -> pd.Series:
+    """
+    Parse dates to datetime64[ns]. Values that don't match the fast path format are parsed with pandas; values that
+    cannot be parsed at all become NaT.
+    """
+    dates, is_valid = parse_date_days(values, date_format)
+    dates = pd.Series(dates.astype("M8[ns]"), index=values.index)
+    if not is_valid.all():
+        dates[~is_valid] = pd.to_datetime(values[~is_valid].astype(str), errors="coerce", format=date_format)
+    return dates
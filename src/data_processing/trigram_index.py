@@ -0,0 +1,161 @@
+import re
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.data_processing.pattern_matching import contains, split_alternatives, _case_folder
+
+TRIGRAM_LENGTH = 3
+# Escapes that match a character class or an empty string, other escapes are not analyzed
+CLASS_ESCAPES = set("dDwWsSbBAZ")
+CODE_POINT_BITS = 21
+REPEAT_PATTERN = re.compile(r"\{\d*(,\d*)?\}")
+
+
+class TrigramIndex:
+    """
+    Inverted index from trigrams of case folded strings to positions of strings that contain them. Search extracts
+    literals that every match of the pattern must contain, takes strings that contain all trigrams of the literals as
+    candidates and matches the pattern only against them. Patterns without such literals are matched against all
+    strings.
+    """
+
+    def __init__(self, strings: pd.Series):
+        """
+        @param strings: Unique values of a text column; values that are not strings never match.
+        """
+        self.strings = strings
+        is_string = strings.map(type).eq(str).to_numpy()
+        folded = _case_folder.fold(strings[is_string].tolist())
+        lengths = np.array([len(s) for s in folded], dtype=np.int64)
+        code_points = np.frombuffer("".join(folded).encode("utf-32-le", "surrogatepass"), dtype=np.uint32)
+        trigrams = _get_trigrams(code_points.astype(np.int64))
+        # Trigram starting at every position of joined strings, excluding the ones that span two strings
+        string_ids = np.repeat(np.flatnonzero(is_string), lengths)[:len(trigrams)]
+        remaining = (np.repeat(lengths, lengths) - _get_offsets(lengths))[:len(trigrams)]
+        trigrams, string_ids = trigrams[remaining >= TRIGRAM_LENGTH], string_ids[remaining >= TRIGRAM_LENGTH]
+        order = np.lexsort((string_ids, trigrams))
+        trigrams, string_ids = trigrams[order], string_ids[order]
+        is_first = np.ones(len(trigrams), dtype=bool)
+        is_first[1:] = (trigrams[1:] != trigrams[:-1]) | (string_ids[1:] != string_ids[:-1])
+        self.trigrams = trigrams[is_first]
+        self.string_ids = string_ids[is_first]
+
+    def contains(self, pattern: str) -> np.ndarray:
+        """
+        Same as pattern_matching.contains(strings, pattern).
+        @return boolean mask of strings that contain the pattern.
+        """
+        candidates = self.get_candidates(pattern)
+        if candidates is None:
+            return contains(self.strings, pattern)
+        mask = np.zeros(len(self.strings), dtype=bool)
+        mask[candidates] = contains(self.strings.iloc[candidates], pattern)
+        return mask
+
+    def get_candidates(self, pattern: str) -> Optional[np.ndarray]:
+        """
+        @return sorted positions of strings that can match the pattern, or None if all strings can.
+        """
+        # Validate pattern, so that errors don't depend on candidates
+        re.compile(pattern, re.IGNORECASE)
+        literals = get_required_literals(pattern)
+        if literals is None:
+            return None
+        candidates = []
+        for alternative_literals in literals:
+            alternative_literals = [literal for literal in alternative_literals if len(literal) >= TRIGRAM_LENGTH]
+            if not alternative_literals:
+                return None
+            folded_literals = _case_folder.fold(alternative_literals)
+            trigrams = np.unique(np.concatenate([_get_trigrams(_to_code_points(literal))
+                                                 for literal in folded_literals]))
+            alternative_candidates = self._get_postings(trigrams[0])
+            for trigram in trigrams[1:]:
+                if len(alternative_candidates) == 0:
+                    break
+                alternative_candidates = np.intersect1d(alternative_candidates, self._get_postings(trigram),
+                                                        assume_unique=True)
+            candidates.append(alternative_candidates)
+        return np.unique(np.concatenate(candidates))
+
+    def _get_postings(self, trigram: int) -> np.ndarray:
+        start, stop = np.searchsorted(self.trigrams, [trigram, trigram + 1])
+        return self.string_ids[start:stop]
+
+
+def get_required_literals(pattern: str) -> Optional[List[List[str]]]:
+    """
+    Get literals that a match of the pattern must contain, e.g. "abc.*def|^ghi" -> [["abc", "def"], ["ghi"]].
+    @return literals of every top level alternative, or None if pattern is not analyzed, e.g. it has inline flags.
+    """
+    if "(?" in pattern:
+        return None
+    literals = []
+    for alternative in split_alternatives(pattern):
+        alternative_literals = _get_alternative_literals(alternative)
+        if alternative_literals is None:
+            return None
+        literals.append(alternative_literals)
+    return literals
+
+
+def _get_alternative_literals(pattern: str) -> Optional[List[str]]:
+    literals = [""]
+    depth = 0
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        character = None
+        if c == "[":
+            # Skip character class, "]" right after "[" or "[^" is literal
+            i += 2 if pattern[i + 1:i + 2] == "^" else 1
+            if pattern[i:i + 1] == "]":
+                i += 1
+            while i < len(pattern) and pattern[i] != "]":
+                i += 2 if pattern[i] == "\\" else 1
+        elif c == "\\":
+            escaped = pattern[i + 1:i + 2]
+            if escaped.isalnum() and escaped not in CLASS_ESCAPES:
+                # E.g. back reference or character code
+                return None
+            character = None if escaped in CLASS_ESCAPES else escaped
+            i += 1
+        elif c == "(":
+            # Groups can be optional or have alternatives, so their content is not required
+            depth += 1
+        elif c == ")":
+            depth -= 1
+        elif c == "|" and depth == 0:
+            return None
+        elif c in "*?" or REPEAT_PATTERN.match(pattern, i):
+            # Previous character is optional
+            literals[-1] = literals[-1][:-1]
+            if c == "{":
+                i = REPEAT_PATTERN.match(pattern, i).end() - 1
+        elif c not in ".^$+":
+            character = c
+        if character is not None and depth == 0:
+            literals[-1] += character
+        elif literals[-1] != "":
+            literals.append("")
+        i += 1
+    return [literal for literal in literals if literal != ""]
+
+
+def _to_code_points(s: str) -> np.ndarray:
+    return np.frombuffer(s.encode("utf-32-le", "surrogatepass"), dtype=np.uint32).astype(np.int64)
+
+
+def _get_trigrams(code_points: np.ndarray) -> np.ndarray:
+    # Three 21 bit code points fit in one integer
+    if len(code_points) < TRIGRAM_LENGTH:
+        return np.zeros(0, dtype=np.int64)
+    return (code_points[:-2] << (2 * CODE_POINT_BITS)) | (code_points[1:-1] << CODE_POINT_BITS) | code_points[2:]
+
+
+def _get_offsets(lengths: np.ndarray) -> np.ndarray:
+    # Position of every character in its string
+    starts = np.cumsum(lengths) - lengths
+    return np.arange(lengths.sum()) - np.repeat(starts, lengths)
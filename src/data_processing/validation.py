@@ -1,46 +1,192 @@
 import datetime
+import logging
+from typing import List, Callable, Dict, Tuple, Optional
 
 import numpy as np
 import pandas as pd
-import pandas_schema
-from pandas_schema import Column
-from pandas_schema.validation import CustomElementValidation
+
+logger = logging.getLogger(__name__)
+
+# Number of rows checked in sampled mode
+DEFAULT_SAMPLE_SIZE = 1000
+# Number of invalid row indices shown per check in error messages
+MAX_SHOWN_ROWS = 10
 
 
 class InvalidDataFrame(Exception):
-    pass
 
+    def __init__(self, message: str, report: "ValidationReport" = None):
+        super().__init__(message)
+        self.report = report
+
+
+class ValidationIssue:
+    """
+    Result of a failed check: column, description of the failure and indices of the failing rows.
+    """
+
+    def __init__(self, column: str, message: str, rows: np.ndarray = None):
+        self.column = column
+        self.message = message
+        self.rows = rows if rows is not None else np.array([], dtype=np.int64)
+
+    @property
+    def count(self) -> int:
+        return len(self.rows)
+
+    def __str__(self):
+        if self.count == 0:
+            return f"Column {self.column}: {self.message}"
+        shown_rows = ", ".join(str(row) for row in self.rows[:MAX_SHOWN_ROWS])
+        if self.count > MAX_SHOWN_ROWS:
+            shown_rows += ", ..."
+        return f"Column {self.column}: {self.message} in {self.count} rows ({shown_rows})"
+
+
+class ValidationReport:
+
+    def __init__(self, n_rows: int, n_checked_rows: int):
+        self.n_rows = n_rows
+        self.n_checked_rows = n_checked_rows
+        self.errors = []  # type: List[ValidationIssue]
+        self.warnings = []  # type: List[ValidationIssue]
+
+    @property
+    def is_valid(self) -> bool:
+        return len(self.errors) == 0
+
+    @property
+    def is_sampled(self) -> bool:
+        return self.n_checked_rows < self.n_rows
+
+    def __str__(self):
+        lines = [f"Checked {self.n_checked_rows}/{self.n_rows} rows, {len(self.errors)} errors"]
+        lines += [f"Error: {error}" for error in self.errors]
+        lines += [f"Warning: {warning}" for warning in self.warnings]
+        return "\n".join(lines)
+
+
+def _all(values: pd.Series, is_true: bool) -> np.ndarray:
+    return np.full(len(values), is_true, dtype=bool)
+
+
+def _element_mask(values: pd.Series, check: Callable[[object], bool]) -> np.ndarray:
+    # Fallback for object columns with mixed types
+    return np.fromiter((check(x) for x in values.to_numpy()), dtype=bool, count=len(values))
+
+
+def _is_not_decimal(values: pd.Series) -> np.ndarray:
+    if pd.api.types.is_float_dtype(values.dtype):
+        return _all(values, False)
+    if values.dtype == object:
+        if pd.api.types.infer_dtype(values, skipna=False) == "floating":
+            return _all(values, False)
+        return ~_element_mask(values, lambda x: isinstance(x, float))
+    return _all(values, True)
+
+
+def _is_not_finite(values: pd.Series) -> np.ndarray:
+    if not pd.api.types.is_float_dtype(values.dtype):
+        return _all(values, False)
+    return np.isinf(values.to_numpy())
+
+
+def _is_not_datetime(values: pd.Series) -> np.ndarray:
+    if pd.api.types.is_datetime64_any_dtype(values.dtype):
+        return _all(values, False)
+    if values.dtype == object:
+        if pd.api.types.infer_dtype(values, skipna=False) in ["datetime", "date"]:
+            return _all(values, False)
+        return ~_element_mask(values, lambda x: isinstance(x, datetime.date))
+    return _all(values, True)
+
+
+def _is_not_string(values: pd.Series) -> np.ndarray:
+    """
+    Strings and missing values are valid.
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        is_invalid_category = _is_not_string(pd.Series(values.cat.categories, dtype=object))
+        codes = values.cat.codes.to_numpy()
+        return (codes >= 0) & np.append(is_invalid_category, False)[codes]
+    if isinstance(values.dtype, pd.StringDtype):
+        return _all(values, False)
+    if values.dtype == object:
+        if pd.api.types.infer_dtype(values, skipna=True) in ["string", "empty"]:
+            return _all(values, False)
+        return ~_element_mask(values, lambda x: isinstance(x, str) or (isinstance(x, float) and np.isnan(x)))
+    if pd.api.types.is_float_dtype(values.dtype):
+        return values.notna().to_numpy()
+    return _all(values, True)
+
+
+def _is_missing(values: pd.Series) -> np.ndarray:
+    if values.dtype == object and pd.api.types.infer_dtype(values, skipna=False) == "string":
+        # Much faster than isna for object columns
+        return _all(values, False)
+    return values.isna().to_numpy()
 
-def check_decimal(x):
-    return isinstance(x, float)
 
+Check = Tuple[Callable[[pd.Series], np.ndarray], str]
 
-def check_datetime(x):
-    return isinstance(x, datetime.date)
+COLUMN_CHECKS = {
+    "value": [(_is_not_decimal, "is not decimal"), (_is_not_finite, "is not finite")],
+    "time": [(_is_not_datetime, "is not datetime")],
+    "bank": [(_is_not_string, "is not string"), (_is_missing, "this field cannot be NaN")],
+    "target": [(_is_not_string, "is not string")],
+    "message": [(_is_not_string, "is not string")],
+    "event": [(_is_not_string, "is not string")],
+    "account_number": [(_is_not_string, "is not string")],
+}  # type: Dict[str, List[Check]]
 
+# Missing values of these columns are allowed (e.g. reservations without booking date) but reported
+COLUMN_WARNINGS = {
+    "value": [(_is_missing, "is missing")],
+    "time": [(_is_missing, "is missing")],
+}  # type: Dict[str, List[Check]]
 
-def check_is_string_or_nan(x):
-    return isinstance(x, str) or np.isnan(x)
 
+def get_validation_report(data: pd.DataFrame, sample_size: Optional[int] = None) -> ValidationReport:
+    """
+    Check data with column level vectorized checks.
+    @param data: Data to check.
+    @param sample_size: Number of randomly selected rows to check, e.g. for data that has been validated before. All
+    the rows are checked if None.
+    @return report of failed checks.
+    """
+    n_rows = data.shape[0]
+    if sample_size is not None and sample_size < n_rows:
+        positions = np.sort(np.random.default_rng(0).choice(n_rows, size=sample_size, replace=False))
+        data = data.iloc[positions]
+    report = ValidationReport(n_rows, data.shape[0])
 
-def validate(data: pd.DataFrame):
-    decimal_validation = [CustomElementValidation(lambda x: check_decimal(x), 'is not decimal')]
-    datetime_validation = [CustomElementValidation(lambda x: check_datetime(x), 'is not datetime')]
-    string_validation = [CustomElementValidation(lambda x: check_is_string_or_nan(x), 'is not string')]
-    nan_validation = [CustomElementValidation(lambda x: x is not np.nan, 'this field cannot be NaN')]
+    for column in data.columns:
+        if column not in COLUMN_CHECKS:
+            report.errors.append(ValidationIssue(column, "the column exists in the data frame but not in the schema"))
+    for column in COLUMN_CHECKS:
+        if column not in data.columns:
+            report.errors.append(ValidationIssue(column, "the column exists in the schema but not in the data frame"))
+            continue
+        values = data[column]
+        for issues, checks in [(report.errors, COLUMN_CHECKS), (report.warnings, COLUMN_WARNINGS)]:
+            for check, message in checks.get(column, []):
+                is_failed = check(values)
+                if is_failed.any():
+                    issues.append(ValidationIssue(column, message, data.index.to_numpy()[is_failed]))
+    return report
 
-    schema = pandas_schema.Schema([
-        Column('value', decimal_validation + nan_validation),
-        Column('time', datetime_validation + nan_validation),
-        Column('bank', string_validation + nan_validation),
-        Column('target', string_validation),
-        Column('message', string_validation),
-        Column('event', string_validation),
-        Column('account_number', string_validation),
-    ])
 
-    errors = schema.validate(data)
-    if len(errors) > 0:
-        for error in errors:
-            print(error)
-        raise InvalidDataFrame("Invalid dataframe!")
+def validate(data: pd.DataFrame, sample_size: Optional[int] = None) -> ValidationReport:
+    """
+    Validate data; see get_validation_report. Failed checks are logged.
+    @raise InvalidDataFrame: if data is not valid.
+    @return report of failed checks.
+    """
+    report = get_validation_report(data, sample_size)
+    for warning in report.warnings:
+        logger.warning(warning)
+    if not report.is_valid:
+        for error in report.errors:
+            logger.error(error)
+        raise InvalidDataFrame("Invalid dataframe!", report)
+    return report
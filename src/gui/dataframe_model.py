@@ -14,8 +14,6 @@ class DataFrameModel(QtCore.QAbstractTableModel):
     def __init__(self, df, parent=None, columns_for_edition=None, boolean_cell_background=False):
         QtCore.QAbstractTableModel.__init__(self, parent)
         self.df = df
-        self._max_values = self.df.max()
-        self._min_values = self.df.min()
         if columns_for_edition:
             self.columns_for_edition = columns_for_edition
         else:
@@ -1,12 +1,17 @@
 import glob
 import logging
 
+import numpy as np
 import pandas as pd
 from PyQt5.QtWidgets import QWidget, QHBoxLayout
 
 from src.config_manager import GENERAL_KEY, DROP_DATA_KEY, CATEGORIES_KEY, LABELS_KEY
-from src.data_processing.data_filtering import filter_data
+from src.data_processing.data_filtering import FilterResultCache, MAX_CACHED_FILTER_RESULTS, \
+    MAX_CACHED_FILTER_POSITIONS, get_filter_columns, get_filter_key, clear_text_index, enable_text_index
+from src.data_processing.dataset import Dataset
 from src.data_processing.data_preprocessing import DataPreprocessor
+from src.data_processing.parallelization import AUTO
+from src.data_processing.transaction_store import TransactionStore
 from src.gui.sidebar import SideBar
 from src.gui.tabs.tab_handler import TabHandler
 
@@ -17,13 +22,28 @@ class MainView(QWidget):
     def __init__(self, config_manager):
         super().__init__()
         self.config_manager = config_manager
-        self.data_processor = DataPreprocessor()
-        self.data_all = None
-        self.data_not_removed = None
-        self.data_removed = None
-        self.data_filtered = None
-
         config = self.config_manager.get_config()
+        self.data_processor = DataPreprocessor(cache_dir=config[GENERAL_KEY].get("cache_dir"),
+                                               parallel_loading=config[GENERAL_KEY].get("parallel_loading", False),
+                                               value_cents=config[GENERAL_KEY].get("value_cents", False),
+                                               compact_layout=config[GENERAL_KEY].get("compact_layout", False),
+                                               execution=config[GENERAL_KEY].get("execution", AUTO))
+        store_dir = config[GENERAL_KEY].get("store_dir")
+        self.store = TransactionStore(store_dir) if store_dir else None
+        # All data; kept (not removed), removed and filtered rows are positions of its rows and they are
+        # materialized only when passed to tabs
+        self.dataset = Dataset()
+        self.kept_positions = np.zeros(0, dtype=np.int64)
+        self.removed_positions = np.zeros(0, dtype=np.int64)
+        self.filtered_positions = np.zeros(0, dtype=np.int64)
+        # Incremented whenever kept rows change
+        self.drop_version = 0
+        # Filter values of filtered rows, see data_filtering.get_filter_key
+        self.filter_key = get_filter_key({})
+        self.filter_cache = FilterResultCache(
+            max_results=config[GENERAL_KEY].get("filter_cache_results", MAX_CACHED_FILTER_RESULTS),
+            max_positions=config[GENERAL_KEY].get("filter_cache_positions", MAX_CACHED_FILTER_POSITIONS))
+
         self.tab_handler = TabHandler(config)
         self.sidebar = SideBar(config[GENERAL_KEY]["default_data_dir"])
         self._set_layout()
@@ -57,23 +77,27 @@ class MainView(QWidget):
         self.tab_handler.events_filtered_out_tab.notes_edited_signal.connect(self._handle_removed_data_notes_edited)
 
     def _handle_load_data(self, file_paths):
-        self.data_all = self.data_processor.get_data(file_paths)
         config = self.config_manager.get_config()
-        self.data_processor.update_extra_columns(self.data_all, config)
-        self.data_not_removed, self.data_removed = self.data_processor.drop_data(self.data_all,
-                                                                                 config[DROP_DATA_KEY])
-        self.data_filtered = self.data_not_removed.copy()
-        self.tab_handler.handle_data(self.data_filtered)
-        self.tab_handler.handle_removed_data(self.data_removed)
-
-        datetime_min = self.data_not_removed.time.min()
-        datetime_max = self.data_not_removed.time.max()
-        self.sidebar.set_dates(datetime_min, datetime_max)
+        if self.store is not None:
+            data_all = self.store.ingest(self.data_processor, file_paths, config)
+        else:
+            data_all = self.data_processor.get_data(file_paths)
+            self.data_processor.update_extra_columns(data_all, config)
+        self.dataset.replace(data_all)
+        # All data is filtered on every change of filters, rows taken from it are filtered without indexes
+        enable_text_index(data_all)
+        self._drop_rows(config[DROP_DATA_KEY])
+        self.filtered_positions = self.kept_positions
+        self.filter_key = get_filter_key({})
+        self._handle_data()
+        self._handle_removed_data()
+
+        times = self.data_all["time"].iloc[self.kept_positions]
+        self.sidebar.set_dates(times.min(), times.max())
 
     def _handle_filtered_data_changed(self, filter_values):
-        filter_values_nulls_removed = self._remove_null_values_from_dict(filter_values)
-        self.data_filtered = filter_data(self.data_not_removed, **filter_values_nulls_removed)
-        self.tab_handler.handle_data(self.data_filtered)
+        self.filtered_positions = self._filter_positions(filter_values)
+        self._handle_data()
 
     def _handle_drop_data_added(self, data: tuple):
         name = data[0]
@@ -81,15 +105,12 @@ class MainView(QWidget):
 
         self.config_manager.add_drop_data(name, value)
         config = self.config_manager.get_config()
-        self.data_processor.update_extra_columns(self.data_all, config)
-        drop_data = config[DROP_DATA_KEY]
-        self.data_not_removed, self.data_removed = self.data_processor.drop_data(self.data_all, drop_data)
-        current_filter_values = self.sidebar.get_filter_values()
-        filter_values_nulls_removed = self._remove_null_values_from_dict(current_filter_values)
-        self.data_filtered = filter_data(self.data_not_removed, **filter_values_nulls_removed)
-
-        self.tab_handler.handle_data(self.data_filtered)
-        self.tab_handler.handle_removed_data(self.data_removed)
+        self.data_processor.update_extra_columns(self.data_all, config, self.dataset)
+        self._drop_rows(config[DROP_DATA_KEY])
+        self.filtered_positions = self._filter_positions(self.sidebar.get_filter_values())
+
+        self._handle_data()
+        self._handle_removed_data()
         self.config_manager.save_config()
 
     def _handle_new_category_created(self, data: tuple):
@@ -101,12 +122,12 @@ class MainView(QWidget):
 
         self.config_manager.add_category(name, filter_values_nulls_removed)
         categories = self.config_manager.get_config()[CATEGORIES_KEY]
-        self.data_processor.add_categories(self.data_filtered, categories)
-        self.data_processor.add_categories(self.data_not_removed, categories)
-        self.data_processor.add_categories(self.data_removed, categories)
+        self.data_processor.add_categories(self.data_all, categories, self.dataset)
+        # Rewritten column is converted back to the compact layout, other columns already have it
+        self.data_processor.apply_layout(self.data_all)
 
-        self.tab_handler.handle_data(self.data_filtered)
-        self.tab_handler.handle_removed_data(self.data_removed)
+        self._handle_data()
+        self._handle_removed_data()
         self.config_manager.save_config()
 
     def _handle_new_label_created(self, data: tuple):
@@ -118,40 +139,71 @@ class MainView(QWidget):
 
         self.config_manager.add_label(name, filter_values_nulls_removed)
         labels = self.config_manager.get_config()[LABELS_KEY]
-        self.data_processor.add_labels(self.data_filtered, labels)
-        self.data_processor.add_labels(self.data_not_removed, labels)
-        self.data_processor.add_labels(self.data_removed, labels)
+        self.data_processor.add_labels(self.data_all, labels, self.dataset)
+        self.data_processor.apply_layout(self.data_all)
 
-        self.tab_handler.handle_data(self.data_filtered)
-        self.tab_handler.handle_removed_data(self.data_removed)
+        self._handle_data()
+        self._handle_removed_data()
         self.config_manager.save_config()
 
     def _handle_filtered_data_notes_edited(self, data: tuple):
-        event_id = data[0]
-        note = data[1]
-
-        if note == "":
-            self.config_manager.remove_note_if_exist(event_id)
-        else:
-            self.config_manager.update_note(event_id, note)
-        self.data_not_removed.loc[self.data_not_removed.id == event_id, "notes"] = note
-        self.data_filtered.loc[self.data_not_removed.id == event_id, "notes"] = note
-
-        self.tab_handler.handle_data(self.data_filtered)
+        self._update_note(*data)
+        self._handle_data()
         self.config_manager.save_config()
 
     def _handle_removed_data_notes_edited(self, data: tuple):
-        event_id = data[0]
-        note = data[1]
+        self._update_note(*data)
+        self._handle_removed_data()
+        self.config_manager.save_config()
 
+    def _update_note(self, event_id: str, note: str):
         if note == "":
             self.config_manager.remove_note_if_exist(event_id)
         else:
             self.config_manager.update_note(event_id, note)
-        self.data_removed.loc[self.data_removed.id == event_id, "notes"] = note
+        # Notes are edited in place, so their text index must be removed
+        self.data_all.loc[self.data_all.id == event_id, "notes"] = note
+        clear_text_index(self.data_all, "notes")
+        self.dataset.update(["notes"])
 
-        self.tab_handler.handle_removed_data(self.data_removed)
-        self.config_manager.save_config()
+    def _drop_rows(self, drop_data: dict):
+        self.kept_positions, self.removed_positions = self.data_processor.get_drop_positions(self.data_all, drop_data)
+        self.drop_version += 1
+
+    def _filter_positions(self, filter_values: dict) -> np.ndarray:
+        filter_values_nulls_removed = self._remove_null_values_from_dict(filter_values)
+        self.filter_key = get_filter_key(filter_values_nulls_removed)
+        # Filter results depend only on kept rows and filtered columns
+        data_version = (self.drop_version,) + \
+            self.dataset.get_version(get_filter_columns(filter_values_nulls_removed))
+        positions = self.filter_cache.filter_positions(self.data_all, data_version, self.kept_positions,
+                                                       **filter_values_nulls_removed)
+        logger.debug(f"Filter cache: {self.filter_cache.hits} hits, {self.filter_cache.misses} misses")
+        return positions
+
+    def _handle_data(self):
+        # Tabs are updated only if filtered rows or any column of data has changed
+        data_version = self.dataset.get_version() + (self.drop_version, self.filter_key)
+        self.tab_handler.handle_data(self.data_filtered, data_version)
+
+    def _handle_removed_data(self):
+        self.tab_handler.handle_removed_data(self.data_removed, self.dataset.get_version() + (self.drop_version,))
+
+    @property
+    def data_all(self) -> pd.DataFrame:
+        return self.dataset.data
+
+    @property
+    def data_not_removed(self) -> pd.DataFrame:
+        return self.data_all.take(self.kept_positions)
+
+    @property
+    def data_removed(self) -> pd.DataFrame:
+        return self.data_all.take(self.removed_positions)
+
+    @property
+    def data_filtered(self) -> pd.DataFrame:
+        return self.data_all.take(self.filtered_positions)
 
     @staticmethod
     def _remove_null_values_from_dict(d):
@@ -20,6 +20,7 @@ class DistributionsTab(BaseTab):
     column_grouping_options = {
         "Target": "target",
         "Category": "category",
+        "Label": "labels",
     }
 
     def __init__(self):
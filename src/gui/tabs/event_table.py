@@ -66,7 +66,7 @@ class EventTableTab(BaseTab):
     def _group_data(self):
         if not self.group_by_target:
             return
-        grouped = self.data.groupby(self.group_by, as_index=False)
+        grouped = self.data.groupby(self.group_by, as_index=False, observed=True)
         grouped_data = pd.DataFrame()
         grouped_data[self.group_by] = grouped.first()[self.group_by]
         grouped_data["sum"] = grouped.sum(numeric_only=True)["value"]
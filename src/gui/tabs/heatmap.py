@@ -2,7 +2,7 @@ import numpy as np
 import pandas as pd
 from PyQt5.QtWidgets import QComboBox, QVBoxLayout, QHBoxLayout, QLabel, QTabWidget
 
-from src.data_processing.data_analysis import fill_by_time
+from src.data_processing.data_analysis import fill_by_time, pivot_by_labels
 from src.gui.canvases.heatmap_canvas import HeatmapCanvas
 from src.gui.widgets import FloatLineEdit, IntLineEdit
 
@@ -17,6 +17,7 @@ class HeatmapTab(QTabWidget):
     index_grouping_options = {
         "Target": "target",
         "Category": "category",
+        "Label": "labels",
     }
     aggregation_options = {
         "Sum": "sum",
@@ -100,13 +101,18 @@ class HeatmapTab(QTabWidget):
         index = self.index_grouping_options[self.index_grouping_selector.currentText()]
         columns = self.time_grouping_options[self.time_grouping_selector.currentText()]
         agg = self.aggregation_options[self.aggregation_selector.currentText()]
-        df = fill_by_time(self.data)
-        self.pivot_df = df.pivot_table(index=index,
-                                       columns=columns,
-                                       aggfunc=agg,
-                                       fill_value=0,
-                                       values="value")
-        self.pivot_df.drop("FILLED", inplace=True, errors="ignore")
+        if index == "labels":
+            # Rows that have several labels are aggregated to each of them
+            self.pivot_df = pivot_by_labels(self.data, columns, agg, time_fill=True).T
+        else:
+            df = fill_by_time(self.data)
+            self.pivot_df = df.pivot_table(index=index,
+                                           columns=columns,
+                                           aggfunc=agg,
+                                           fill_value=0,
+                                           values="value",
+                                           observed=True)
+            self.pivot_df.drop("FILLED", inplace=True, errors="ignore")
 
     def _get_pivot_table_subset(self):
         row_sum = abs(self.pivot_df).sum(axis=1)
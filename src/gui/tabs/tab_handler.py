@@ -1,3 +1,5 @@
+from typing import Hashable
+
 import pandas as pd
 from PyQt5.QtWidgets import QWidget, QTabWidget, QVBoxLayout
 
@@ -22,6 +24,9 @@ class TabHandler(QWidget):
         self.events_tab = EventTableWithDropDataTab()
         self.events_filtered_out_tab = EventTableTab()
         self.checks_tab = ChecksTab(config[CHECKS_KEY])
+        # Versions of the latest handled data, see handle_data
+        self.data_version = None
+        self.removed_data_version = None
 
         self.content = QTabWidget()
         self.content.addTab(self.incomes_and_outcomes_tab, "Incomes & Outcomes")
@@ -38,7 +43,14 @@ class TabHandler(QWidget):
         self.layout = QVBoxLayout()
         self.layout.addWidget(self.content)
 
-    def handle_data(self, data: pd.DataFrame):
+    def handle_data(self, data: pd.DataFrame, data_version: Hashable = None):
+        """
+        @param data_version: Version of data, e.g. from dataset.Dataset.get_version. Tabs are not updated if it equals
+        the version of the previously handled data; None always updates them.
+        """
+        if data_version is not None and data_version == self.data_version:
+            return
+        self.data_version = data_version
         for tab in [self.incomes_and_outcomes_tab,
                     self.year_comparison_tab,
                     self.distributions_tab,
@@ -47,5 +59,8 @@ class TabHandler(QWidget):
                     self.checks_tab]:
             tab.handle_data(data)
 
-    def handle_removed_data(self, data: pd.DataFrame):
+    def handle_removed_data(self, data: pd.DataFrame, data_version: Hashable = None):
+        if data_version is not None and data_version == self.removed_data_version:
+            return
+        self.removed_data_version = data_version
         self.events_filtered_out_tab.handle_data(data)
@@ -0,0 +1,62 @@
+import os
+import unittest
+
+import pandas as pd
+
+from src.config_manager import ConfigManager, DROP_DATA_KEY
+from src.data_processing.checks.utils import get_checks
+from src.data_processing.data_analysis import truncated_pivot_analysis, calculate_incomes_and_outcomes
+from src.data_processing.data_filtering import filter_data
+from src.data_processing.data_preprocessing import DataPreprocessor
+
+
+class TestCompactLayout(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        root_path = os.path.abspath(os.path.dirname(__file__))
+        data_path = os.path.join(root_path, "test_data")
+        files = [os.path.join(data_path, f) for f in os.listdir(data_path) if f.endswith(".txt")]
+        cls.config = ConfigManager(os.path.join(root_path, "..", "config.json")).get_config()
+        cls.data, cls.compact_data = [cls._load(DataPreprocessor(compact_layout=compact), files, cls.config)
+                                      for compact in [False, True]]
+
+    @staticmethod
+    def _load(data_processor, files, config):
+        data = data_processor.get_data(files)
+        data = data_processor.update_extra_columns(data, config)
+        data, _ = data_processor.drop_data(data, config[DROP_DATA_KEY])
+        return data
+
+    def _assert_frame_equal(self, compact_result, result):
+        pd.testing.assert_frame_equal(compact_result, result, check_dtype=False, check_categorical=False,
+                                      check_index_type=False, check_column_type=False)
+
+    def test_dtypes(self):
+        self.assertIsInstance(self.compact_data["bank"].dtype, pd.CategoricalDtype)
+        self.assertIsInstance(self.compact_data["category"].dtype, pd.CategoricalDtype)
+        self.assertEqual(self.compact_data["month"].dtype, "int8")
+        self.assertLess(self.compact_data.memory_usage(deep=True).sum(), self.data.memory_usage(deep=True).sum() / 2)
+
+    def test_filtering(self):
+        filters = [{"target": "^a|market"}, {"category": "names", "max_value": -10}, {"labels": "example"},
+                   {"event": "event 1", "min_date": "2018-01-01"}, {"is_duplicate": True}]
+        for filter_values in filters:
+            result = filter_data(self.data, **filter_values)
+            compact_result = filter_data(self.compact_data, **filter_values)
+            self.assertEqual(compact_result["id"].tolist(), result["id"].tolist())
+
+    def test_checks(self):
+        for check in get_checks(self.config["checks"]):
+            passed, result = check.apply(self.data.copy())
+            compact_passed, compact_result = check.apply(self.compact_data.copy())
+            self.assertEqual(compact_passed, passed)
+            self._assert_frame_equal(compact_result, result)
+
+    def test_analysis(self):
+        for group_by, columns in [(["year"], "category"), (["year", "month"], "target"), (["year", "week"], "labels")]:
+            result = truncated_pivot_analysis(self.data, group_by=group_by, columns=columns)
+            compact_result = truncated_pivot_analysis(self.compact_data, group_by=group_by, columns=columns)
+            self._assert_frame_equal(compact_result, result)
+        self._assert_frame_equal(calculate_incomes_and_outcomes(self.compact_data.copy(), "M"),
+                                 calculate_incomes_and_outcomes(self.data.copy(), "M"))
@@ -0,0 +1,136 @@
+import datetime
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from src.data_processing.data_filtering import filter_data, filter_positions, date_min_filter, date_max_filter, \
+    float_min_filter, float_max_filter, string_filter, boolean_filter, get_time_index, TIME_INDEX_KEY, \
+    get_text_index, FilterResultCache, clear_text_index, enable_text_index
+from tests.base_test import BaseTest
+
+FILTERS = [
+    {},
+    {"min_date": "2018-01-01", "max_value": 0, "target": "^a|b"},
+    {"max_date": "2020-01-01", "min_value": -50, "category": "names", "labels": "example", "is_duplicate": False},
+    {"message": "test", "event": "event", "notes": "note", "id": "a"},
+    {"target": "does not exist", "min_value": 0},
+    {"labels": "example LABEL", "min_value": -100},
+    {"labels": "names starting with", "max_value": 0},
+]
+
+
+def filter_data_sequentially(data, min_date=None, max_date=None, min_value=None, max_value=None, target=None,
+                             account_number=None, message=None, event=None, category=None, labels=None, notes=None,
+                             id=None, is_duplicate=None):
+    filtered_data = data.copy()
+    filters = [
+        [date_min_filter, "time", min_date],
+        [date_max_filter, "time", max_date],
+        [float_min_filter, "value", min_value],
+        [float_max_filter, "value", max_value],
+        [string_filter, "target", target],
+        [string_filter, "account_number", account_number],
+        [string_filter, "message", message],
+        [string_filter, "event", event],
+        [string_filter, "category", category],
+        [string_filter, "labels", labels],
+        [string_filter, "notes", notes],
+        [string_filter, "id", id],
+        [boolean_filter, "is_duplicate", is_duplicate]
+    ]
+    for func, col, val in filters:
+        if val is not None:
+            filtered_data = func(filtered_data, col, val)
+            if filtered_data.empty:
+                return filtered_data
+    return filtered_data
+
+
+class TestDataFiltering(BaseTest):
+
+    def test_filter_data(self):
+        # Large enough data to estimate selectivity of filters
+        data = pd.concat([self.data] * 10)
+        for filter_values in FILTERS:
+            expected = filter_data_sequentially(data, **filter_values)
+            pd.testing.assert_frame_equal(filter_data(data, **filter_values), expected)
+            positions = filter_positions(data, **filter_values)
+            pd.testing.assert_frame_equal(data.iloc[positions], expected)
+
+    def test_filter_positions_of_rows(self):
+        data = self.data.sort_values("time").reset_index(drop=True)
+        positions = np.arange(0, data.shape[0], 3)
+        for filter_values in FILTERS + [{"min_date": data["time"].iloc[30], "max_date": data["time"].iloc[90]}]:
+            expected = filter_data_sequentially(data.iloc[positions], **filter_values)
+            pd.testing.assert_frame_equal(data.iloc[filter_positions(data, positions, **filter_values)], expected)
+
+    def test_unknown_filter(self):
+        with self.assertRaises(TypeError):
+            filter_positions(self.data, amount=1)
+
+    def test_time_index(self):
+        data = self.data.sort_values("time").reset_index(drop=True)
+        self.assertIsNotNone(get_time_index(data))
+        dates = [None, "2000-01-01", data["time"].iloc[10], data["time"].iloc[20], datetime.datetime(2100, 1, 1)]
+        for min_date in dates:
+            for max_date in dates:
+                expected = filter_data_sequentially(data, min_date=min_date, max_date=max_date, max_value=0)
+                pd.testing.assert_frame_equal(filter_data(data, min_date=min_date, max_date=max_date, max_value=0),
+                                              expected)
+
+    def test_time_index_is_not_used_for_other_data(self):
+        data = self.data.sort_values("time").reset_index(drop=True)
+        get_time_index(data)
+        reversed_data = data.iloc[::-1]
+        self.assertIs(reversed_data.attrs.get(TIME_INDEX_KEY), data.attrs[TIME_INDEX_KEY])
+        self.assertIsNone(get_time_index(reversed_data))
+        min_date = data["time"].iloc[10]
+        pd.testing.assert_frame_equal(filter_data(reversed_data, min_date=min_date),
+                                      date_min_filter(reversed_data, "time", min_date))
+
+    def test_text_index(self):
+        data = pd.concat([self.data] * 10)
+        enable_text_index(data)
+        with mock.patch("src.data_processing.data_filtering.MIN_TEXT_INDEX_ROWS", 0):
+            for filter_values in FILTERS + [{"message": "(?i)TEST"}, {"target": "exa.ple|ab"}]:
+                expected = filter_data_sequentially(data, **filter_values)
+                pd.testing.assert_frame_equal(filter_data(data, **filter_values), expected)
+
+            # Filtered rows are searched without building indexes
+            filtered_data = filter_data(data, message="test")
+            with mock.patch("src.data_processing.data_filtering.TextIndex") as text_index_class:
+                filtered_data = filter_data(filtered_data, message="1", event="event")
+            text_index_class.assert_not_called()
+            expected = filter_data_sequentially(filter_data_sequentially(data, message="test"), message="1",
+                                                event="event")
+            pd.testing.assert_frame_equal(filtered_data, expected)
+
+            text_index = get_text_index(data, "message")
+            self.assertIs(get_text_index(data, "message"), text_index)
+            data["message"] = data["message"].astype(object).str.upper()
+            self.assertIsNot(get_text_index(data, "message"), text_index)
+            pd.testing.assert_frame_equal(filter_data(data, message="TEST"), string_filter(data, "message", "TEST"))
+
+            # Index is not updated when column is modified in place
+            data = data.reset_index(drop=True)
+            text_index = get_text_index(data, "message")
+            data.loc[0, "message"] = "in place edit"
+            self.assertIs(get_text_index(data, "message"), text_index)
+            clear_text_index(data, "message")
+            pd.testing.assert_frame_equal(filter_data(data, message="in place"),
+                                          string_filter(data, "message", "in place"))
+
+    def test_filter_result_cache(self):
+        cache = FilterResultCache(max_results=2)
+        positions = cache.filter_positions(self.data, 1, min_date="2018-01-01", target=None, max_value=0)
+        np.testing.assert_array_equal(positions, filter_positions(self.data, min_date="2018-01-01", max_value=0))
+        self.assertIs(cache.filter_positions(self.data, 1, max_value=0, min_date=datetime.date(2018, 1, 1)),
+                      positions)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+        cache.filter_positions(self.data, 2, min_date="2018-01-01", max_value=0)
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+        cache.filter_positions(self.data, 2, target="example")
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get({"min_date": "2018-01-01", "max_value": 0}, 1))
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+
+from src.data_processing.data_preprocessing import DataPreprocessor
+from tests.base_test import BaseTest
+
+
+def add_is_duplicate_with_loop(data):
+    grouped_by_id = data.groupby("id").count()
+    duplicates_ids = np.unique(grouped_by_id[grouped_by_id.target > 1].index)
+    data["is_duplicate"] = False
+    for duplicate_id in duplicates_ids:
+        data.loc[data.id == duplicate_id, "is_duplicate"] = True
+
+
+def add_notes_with_loop(data, notes):
+    data["notes"] = ""
+    if notes is not None:
+        for event_id, note in notes.items():
+            data.loc[data.id == event_id, "notes"] = note
+
+
+def drop_rows_with_concat(data, drop_data):
+    data_removed = pd.DataFrame(columns=data.columns)
+    for column_name, row_name in drop_data.items():
+        i = data[column_name].isin(row_name)
+        data_removed = pd.concat([data_removed, data.loc[i]])
+        data = data.loc[~i]
+    return data, data_removed
+
+
+class TestDataPreprocessing(BaseTest):
+
+    def setUp(self):
+        # Some rows twice, so that there are duplicates
+        self.data_all = pd.concat([self.data, self.data_filtered_out, self.data.iloc[::7]])
+
+    def test_add_is_duplicate(self):
+        data, expected = self.data_all.copy(), self.data_all.copy()
+        DataPreprocessor.add_is_duplicate(data)
+        add_is_duplicate_with_loop(expected)
+        self.assertTrue(data["is_duplicate"].any())
+        self.assertListEqual(data["is_duplicate"].tolist(), expected["is_duplicate"].tolist())
+
+    def test_add_notes(self):
+        ids = self.data_all["id"].unique()
+        notes = {event_id: f"Note {i}" for i, event_id in enumerate(ids[::3])}
+        notes["does not exist"] = "Note"
+        for notes_config in [notes, {}, None]:
+            data, expected = self.data_all.copy(), self.data_all.copy()
+            DataPreprocessor.add_notes(data, notes_config)
+            add_notes_with_loop(expected, notes_config)
+            self.assertListEqual(data["notes"].tolist(), expected["notes"].tolist())
+
+    def test_drop_rows(self):
+        targets = self.data_all["target"].unique()
+        drop_data = {"category": ["Income"], "target": list(targets[:5]), "event": ["event 1"]}
+        for drop_data_config in [drop_data, {"target": ["does not exist"]}, {}]:
+            data, removed = DataPreprocessor.drop_rows(self.data_all, drop_data_config)
+            expected_data, expected_removed = drop_rows_with_concat(self.data_all, drop_data_config)
+            pd.testing.assert_frame_equal(data, expected_data)
+            # Legacy implementation converts all columns of removed data to object
+            pd.testing.assert_frame_equal(removed.astype(object), expected_removed.astype(object),
+                                          check_index_type=False)
+            kept_positions, removed_positions = DataPreprocessor.get_drop_positions(self.data_all, drop_data_config)
+            pd.testing.assert_frame_equal(self.data_all.take(kept_positions), data)
+            pd.testing.assert_frame_equal(self.data_all.take(removed_positions), removed)
+        self.assertGreater(DataPreprocessor.drop_rows(self.data_all, drop_data)[1].shape[0], 0)
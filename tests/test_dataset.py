@@ -0,0 +1,46 @@
+import unittest
+
+import pandas as pd
+
+from src.data_processing.dataset import Dataset
+
+
+class TestDataset(unittest.TestCase):
+
+    def test_versions(self):
+        dataset = Dataset(pd.DataFrame({"key": [1, 2], "notes": ["a", "b"], "category": ["x", "y"]}))
+        notes_version = dataset.get_version(["notes"])
+        category_version = dataset.get_version(["category"])
+        version = dataset.get_version()
+
+        dataset.data.loc[0, "notes"] = "c"
+        dataset.update(["notes"])
+        self.assertNotEqual(dataset.get_version(["notes"]), notes_version)
+        self.assertEqual(dataset.get_version(["category"]), category_version)
+        self.assertNotEqual(dataset.get_version(), version)
+
+        dataset.replace(dataset.data.iloc[:1])
+        self.assertNotEqual(dataset.get_version(["category"]), category_version)
+        self.assertNotEqual(dataset.get_version([]), Dataset().get_version([]))
+
+    def test_fingerprint(self):
+        data = pd.DataFrame({"key": [1, 2], "notes": ["a", "b"], "category": ["x", "y"]})
+        dataset = Dataset(data.copy())
+        fingerprint = dataset.get_fingerprint()
+        notes_fingerprint = dataset.get_fingerprint(["notes"])
+        category_fingerprint = dataset.get_fingerprint(["category"])
+        self.assertEqual(Dataset(data.copy()).get_fingerprint(), fingerprint)
+
+        # Fingerprint is computed once per version, unreported changes are not seen
+        dataset.data["notes"] = ["a", "c"]
+        self.assertEqual(dataset.get_fingerprint(["notes"]), notes_fingerprint)
+        dataset.update(["notes"])
+        self.assertNotEqual(dataset.get_fingerprint(["notes"]), notes_fingerprint)
+        self.assertNotEqual(dataset.get_fingerprint(), fingerprint)
+        self.assertEqual(dataset.get_fingerprint(["category"]), category_fingerprint)
+        dataset.data["notes"] = ["a", "b"]
+        dataset.update(["notes"])
+        self.assertEqual(dataset.get_fingerprint(), fingerprint)
+
+        dataset.replace(data.iloc[:1])
+        self.assertNotEqual(dataset.get_fingerprint(["category"]), category_fingerprint)
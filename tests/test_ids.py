@@ -0,0 +1,42 @@
+import hashlib
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.data_processing.ids import get_keys, get_legacy_ids
+
+
+def get_ids_with_strings(data):
+    s = data['account_number'].copy()
+    s += " " + data['target']
+    s += " " + data['message']
+    s += " " + data['account_number']
+    s += " " + data['event']
+    s += " " + data['value'].astype(str)
+    s += " " + data['time'].astype(str)
+    return [hashlib.md5(i.encode('utf-8')).hexdigest() for i in s]
+
+
+class TestIds(unittest.TestCase):
+
+    def setUp(self):
+        self.data = pd.DataFrame({
+            "account_number": ["FI1", "FI1", "FI2", "FI1", "FI1"],
+            "target": ["a", "a", "b", "a", "ä"],
+            "message": ["NA", "NA", "m", "NA", "x"],
+            "event": ["e", "e", "e", "e", "e"],
+            "value": [-0.0, -0.0, 0.0, 12.3, 1e-05],
+            "time": pd.to_datetime(["2020-01-01", "2020-01-01", "2020-01-02", "2020-01-03", None]),
+        })
+
+    def test_legacy_ids(self):
+        self.assertEqual(get_legacy_ids(self.data).tolist(), get_ids_with_strings(self.data))
+        self.data.loc[1, "time"] = pd.Timestamp("2020-01-01 12:00")
+        self.assertEqual(get_legacy_ids(self.data).tolist(), get_ids_with_strings(self.data))
+
+    def test_keys(self):
+        keys = get_keys(self.data)
+        self.assertEqual(keys.dtype, np.uint64)
+        self.assertEqual(keys[0], keys[1])
+        self.assertEqual(len(np.unique(keys)), 4)
@@ -0,0 +1,56 @@
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from src.data_processing.labels import LabelSet
+
+
+class TestLabelSet(unittest.TestCase):
+
+    def setUp(self):
+        masks = np.array([[True, False, True], [False, False, False], [True, False, True], [False, True, False]])
+        self.label_set = LabelSet.from_masks(["a", "b", "c"], masks)
+
+    def test_from_masks(self):
+        self.assertListEqual(self.label_set.to_lists(), [["a", "c"], [], ["a", "c"], ["b"]])
+        self.assertEqual(self.label_set.get_combinations().shape, (3, 3))
+        self.assertListEqual(self.label_set.mask("c").tolist(), [True, False, True, False])
+        self.assertListEqual(self.label_set.mask("b", "c").tolist(), [True, False, True, True])
+        self.assertListEqual(self.label_set.take(np.array([3, 0])).mask("b").tolist(), [True, False])
+
+    def test_aggregations(self):
+        self.assertListEqual(self.label_set.count().iloc[0].tolist(), [2, 1, 2])
+        values = np.array([1.0, 2.0, 3.0, 4.0])
+        self.assertListEqual(self.label_set.sum(values).iloc[0].tolist(), [4.0, 4.0, 4.0])
+        sums = self.label_set.sum(values, groups=np.array([0, 0, 1, 1]))
+        self.assertListEqual(sums.values.tolist(), [[1.0, 0.0, 1.0], [3.0, 4.0, 3.0]])
+        self.assertListEqual(list(sums.columns), ["a", "b", "c"])
+
+    def test_column(self):
+        column = self.label_set.to_column()
+        self.assertListEqual(list(column), ["a | c", "", "a | c", "b"])
+        self.assertEqual(len(column.categories), 3)
+        parsed = LabelSet.from_column(pd.Series(list(column) + [np.nan]), ["a", "b", "c"])
+        np.testing.assert_array_equal(parsed.get_matrix()[:4], self.label_set.get_matrix())
+        self.assertFalse(parsed.get_matrix()[4].any())
+
+    def test_from_data(self):
+        data = pd.DataFrame({"value": [1, 2, 3, 4]})
+        self.label_set.set_column(data)
+        taken = data.take([3, 1, 0])
+        with mock.patch.object(LabelSet, "from_column") as from_column:
+            label_set = LabelSet.from_data(taken)
+        from_column.assert_not_called()
+        self.assertListEqual(label_set.names, ["a", "b", "c"])
+        self.assertListEqual(label_set.to_lists(), [["b"], [], ["a", "c"]])
+
+        # Label set of edited column is parsed from the column
+        data["labels"] = data["labels"].astype(str)
+        self.assertListEqual(LabelSet.from_data(data).to_lists(), [["a", "c"], [], ["a", "c"], ["b"]])
+
+    def test_empty(self):
+        label_set = LabelSet.from_masks(["a"], np.zeros((0, 1), dtype=bool))
+        self.assertListEqual(label_set.to_lists(), [])
+        self.assertEqual(len(label_set.to_column()), 0)
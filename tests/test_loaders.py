@@ -0,0 +1,44 @@
+import bz2
+import gzip
+import lzma
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+
+import pandas as pd
+
+from src.data_processing.data_preprocessing import DataPreprocessor
+
+
+class TestCompressedExports(unittest.TestCase):
+
+    def setUp(self):
+        root_path = os.path.abspath(os.path.dirname(__file__))
+        self.file_path = os.path.join(root_path, "test_data", "Tapahtumat_FI12345_2014.txt")
+        self.tmp_dir = tempfile.mkdtemp()
+        self.expected = DataPreprocessor().load_and_transform_data([self.file_path])
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _assert_same_as_uncompressed(self, compressed_path):
+        output = DataPreprocessor().load_and_transform_data([compressed_path])
+        pd.testing.assert_frame_equal(output, self.expected)
+
+    def test_compressed_files(self):
+        for extension, opener in [(".gz", gzip.open), (".xz", lzma.open), (".bz2", bz2.open)]:
+            compressed_path = os.path.join(self.tmp_dir, os.path.basename(self.file_path) + extension)
+            with open(self.file_path, "rb") as f_in, opener(compressed_path, "wb") as f_out:
+                shutil.copyfileobj(f_in, f_out)
+            self._assert_same_as_uncompressed(compressed_path)
+
+    def test_zip_file(self):
+        compressed_path = os.path.join(self.tmp_dir, os.path.basename(self.file_path) + ".zip")
+        with zipfile.ZipFile(compressed_path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            archive.write(self.file_path, arcname=os.path.basename(self.file_path))
+        self._assert_same_as_uncompressed(compressed_path)
+
+    def test_account_number_is_read_from_preamble(self):
+        self.assertListEqual(self.expected["account_number"].unique().tolist(), ["FI12345"])
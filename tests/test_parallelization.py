@@ -0,0 +1,45 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.data_processing.parallelization import process_df_parallel, get_pool, ExecutionPlanner, SERIAL, THREADS, \
+    PROCESSES, process_parallel
+
+
+def _get_text_lengths(df: pd.DataFrame) -> np.ndarray:
+    return df["text"].astype(str).str.len().to_numpy() + df["value"].to_numpy()
+
+
+class TestParallelization(unittest.TestCase):
+
+    def test_process_df_parallel(self):
+        df = pd.DataFrame({"text": ["a", "bb", None, "dddd", "a"], "value": [0, 10, 20, 30, 40]},
+                          index=[4, 2, 0, 1, 3])
+        pool = get_pool()
+        for n_tasks in [1, 2, 8]:
+            results = process_df_parallel(df, _get_text_lengths, n_tasks)
+            self.assertEqual(len(results), n_tasks)
+            self.assertListEqual(np.concatenate(results).tolist(), [1, 12, 23, 34, 41])
+        self.assertIs(get_pool(), pool)
+
+    def test_process_parallel(self):
+        pool = get_pool()
+        self.assertListEqual(process_parallel(["a", "bb", "ccc"], len, n_workers=2), [1, 2, 3])
+        self.assertListEqual(process_parallel(["a"], len), [1])
+        self.assertIs(get_pool(), pool)
+
+    def test_execution_planner(self):
+        planner = ExecutionPlanner(n_workers=4)
+        self.assertEqual(planner.plan("categorize", 1200, 50).mode, SERIAL)
+        large_plan = planner.plan("categorize", 10 ** 6, 500, n_columns=3)
+        self.assertEqual(large_plan.mode, PROCESSES)
+        self.assertEqual(large_plan.n_tasks, 4)
+        self.assertEqual(ExecutionPlanner(THREADS, n_workers=4).plan("categorize", 1200, 50).mode, THREADS)
+        with self.assertRaises(ValueError):
+            ExecutionPlanner("gpu")
+
+        df = pd.DataFrame({"text": ["a", "bb"] * 10000, "value": 10})
+        results = planner.run("lengths", df, _get_text_lengths, 1)
+        self.assertListEqual(np.concatenate(results)[:3].tolist(), [11, 12, 11])
+        self.assertIn("lengths", planner.unit_costs)
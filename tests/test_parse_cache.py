@@ -0,0 +1,39 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import pandas as pd
+
+from src.data_processing.data_preprocessing import DataPreprocessor
+
+
+class TestParseCache(unittest.TestCase):
+
+    def setUp(self):
+        root_path = os.path.abspath(os.path.dirname(__file__))
+        data_path = os.path.join(root_path, "test_data")
+        self.files = sorted([os.path.join(data_path, f) for f in os.listdir(data_path) if f.endswith(".txt")])
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_cached_data_equals_parsed_data(self):
+        expected = DataPreprocessor().load_and_transform_data(self.files)
+        data_processor = DataPreprocessor(cache_dir=self.cache_dir)
+        data_processor.load_and_transform_data(self.files)
+        self.assertEqual(len(os.listdir(self.cache_dir)), len(self.files))
+        output = data_processor.load_and_transform_data(self.files)
+        pd.testing.assert_frame_equal(output, expected)
+
+    def test_changed_file_is_parsed_again(self):
+        file_path = os.path.join(self.cache_dir, "Tapahtumat_FI12345_2014.txt")
+        shutil.copy(self.files[0], file_path)
+        data_processor = DataPreprocessor(cache_dir=os.path.join(self.cache_dir, "cache"))
+        n_rows = data_processor.load_and_transform_data([file_path]).shape[0]
+        with open(file_path, "a", encoding="utf-8") as f:
+            f.write("Test Target\t\t\t-1,0\t01.01.2014\n")
+        output = data_processor.load_and_transform_data([file_path])
+        self.assertEqual(output.shape[0], n_rows + 1)
+        self.assertEqual(len(os.listdir(os.path.join(self.cache_dir, "cache"))), 1)
@@ -0,0 +1,24 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.data_processing.transformers.parsing import parse_amounts, parse_dates, amounts_to_cents
+
+
+class TestParsing(unittest.TestCase):
+
+    def test_parse_amounts(self):
+        values = pd.Series(["-12,50", "+3", "0,1", "1234.56", "-0,05", "1e3", np.nan, "12,345"])
+        expected = pd.to_numeric(values.str.replace(",", "."))
+        pd.testing.assert_series_equal(parse_amounts(values), expected)
+
+    def test_parse_dates(self):
+        values = pd.Series(["31.12.2019", "29.02.2020", "29.02.2019", "1.1.2020", "", np.nan, "01.01.1500"])
+        expected = pd.to_datetime(values.astype(str), errors="coerce", format="%d.%m.%Y")
+        pd.testing.assert_series_equal(parse_dates(values, "%d.%m.%Y"), expected)
+
+    def test_amounts_to_cents(self):
+        np.testing.assert_array_equal(amounts_to_cents(np.array([-12.5, 0.1, 1234.56])), [-1250, 10, 123456])
+        self.assertIsNone(amounts_to_cents(np.array([1.0, 1 / 3])))
+        self.assertIsNone(amounts_to_cents(np.array([1.0, np.nan])))
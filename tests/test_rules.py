@@ -0,0 +1,121 @@
+import re
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from src.data_processing.data_analysis import categorize, extract_labels
+from src.data_processing.data_filtering import filter_data, string_mask, FactorizedStrings, unique_string_mask
+from src.data_processing.dataset import Dataset
+from src.data_processing.pattern_matching import match_patterns, contains
+from src.data_processing.rules import RuleSet, RuleMatchCache
+from tests.base_test import BaseTest
+
+SPECIFICATIONS = {
+    "Income": {"min_value": 0.0},
+    "Names starting with A": {"target": "^a"},
+    "Large": {"min_value": 100, "max_value": 1000, "event": "event"},
+    "Recent": {"min_date": "2019-01-01", "max_date": "2020-06-30", "target": None},
+    "Message": {"message": "test message 1|test message 2"},
+    "Nothing": {"target": "does not exist"},
+}
+
+
+def categorize_with_filters(data, specifications):
+    data = data.reset_index(drop=True)
+    categories = ["Other"] * data.shape[0]
+    for name, filter_values in specifications.items():
+        for i in filter_data(data, **filter_values).index:
+            categories[i] = name
+    return categories
+
+
+def extract_labels_with_filters(data, specifications):
+    data = data.reset_index(drop=True)
+    labels = [[] for _ in range(data.shape[0])]
+    for name, filter_values in specifications.items():
+        for i in filter_data(data, **filter_values).index:
+            labels[i].append(name)
+    return labels
+
+
+class TestRules(BaseTest):
+
+    def test_categorize(self):
+        result = RuleSet(SPECIFICATIONS).categorize(self.data).tolist()
+        self.assertListEqual(result, categorize_with_filters(self.data, SPECIFICATIONS))
+        self.assertEqual(len(set(result)), 6)
+
+    def test_extract_labels(self):
+        result = RuleSet(SPECIFICATIONS).extract_labels(self.data)
+        self.assertListEqual(result, extract_labels_with_filters(self.data, SPECIFICATIONS))
+
+    def test_unknown_filter(self):
+        with self.assertRaises(TypeError):
+            RuleSet({"Invalid": {"amount": 1}})
+
+    def test_string_mask_on_unique_values(self):
+        values = pd.Series(["Alepa", np.nan, "K-market", "alepa", "Lidl"])
+        expected = [True, False, False, True, False]
+        for column_values in [values, values.astype("category")]:
+            self.assertListEqual(string_mask(column_values, " ^alepa ").tolist(), expected)
+        strings = FactorizedStrings(pd.DataFrame({"target": values}))
+        self.assertListEqual(strings.mask("target", "a", np.array([4, 2, 1])).tolist(), [False, True, False])
+
+    def test_match_patterns(self):
+        uniques = pd.Series(["Alepa Oy", "K-MARKET", "kesko", "ALEPA", "lidl (1)", 1.5], dtype=object)
+        patterns = ["alepa", " ^k", "^alepa$", "a|^lid", "market|[0-9]", "l\\w+ \\(", "k-market oy", ""]
+        result = match_patterns(uniques, patterns)
+        for i, pattern in enumerate(patterns):
+            self.assertListEqual(result[:, i].tolist(), unique_string_mask(uniques, pattern).tolist())
+
+    def test_threaded_contains(self):
+        values = pd.Series(["Alepa", None, "K-market", "kesko", "Kıoski", "ALEPA"] * 3, dtype=object)
+        with mock.patch("os.cpu_count", return_value=4), \
+                mock.patch("src.data_processing.pattern_matching.MIN_THREADED_VALUES", 1), \
+                mock.patch("src.data_processing.pattern_matching.THREADED_CHUNK_SIZE", 4):
+            for pattern in ["^k", "alepa|market", "i", "[[:alpha:]]"]:
+                expected = values.str.contains(pattern, flags=re.IGNORECASE, na=False).tolist()
+                self.assertListEqual(contains(values, pattern).tolist(), expected)
+
+    def test_threaded_contains_with_class_escapes(self):
+        # Combining diaeresis and superscripts are word characters in regex module but not in re
+        values = pd.Series(["a\u0308", "x\u0308y", "x²", "¾", "a b", "ab", "12"] * 3, dtype=object)
+        with mock.patch("os.cpu_count", return_value=4), \
+                mock.patch("src.data_processing.pattern_matching.MIN_THREADED_VALUES", 1), \
+                mock.patch("src.data_processing.pattern_matching.THREADED_CHUNK_SIZE", 4):
+            for pattern in ["\\w+$", "a\\b", "x\\w", "\\W", "a\\B", "\\d", "^\\S+$"]:
+                expected = values.str.contains(pattern, flags=re.IGNORECASE, na=False).tolist()
+                self.assertListEqual(contains(values, pattern).tolist(), expected, pattern)
+
+    def test_cached_rule_matches(self):
+        cache = RuleMatchCache()
+        specifications = dict(SPECIFICATIONS)
+        self.assertListEqual(categorize(self.data, specifications, cache=cache),
+                             categorize_with_filters(self.data, specifications))
+        self.assertEqual(len(cache), len(specifications))
+        # Cached matches are found with the fingerprint of a dataset of equal data
+        with mock.patch("src.data_processing.data_analysis.RuleSet", wraps=RuleSet) as rule_set_class:
+            categorize(self.data.copy(), specifications, cache=cache, dataset=Dataset(self.data.copy()))
+        self.assertEqual(rule_set_class.call_count, 1)
+
+        # Only the new and the edited rule are evaluated
+        specifications["New"] = {"target": "^b"}
+        specifications["Income"] = {"min_value": 10.0}
+        with mock.patch("src.data_processing.data_analysis.RuleSet", wraps=RuleSet) as rule_set_class:
+            result = categorize(self.data, specifications, cache=cache)
+        self.assertListEqual(list(rule_set_class.call_args_list[-1].args[0]), ["Income", "New"])
+        self.assertListEqual(result, categorize_with_filters(self.data, specifications))
+        labels = extract_labels(self.data, specifications, cache=cache)
+        self.assertListEqual(labels, extract_labels_with_filters(self.data, specifications))
+        self.assertEqual(len(cache), len(specifications) + 1)
+
+        # Rules are cached by their own columns, so a rule on a new column and edited notes don't invalidate others
+        dataset = Dataset(self.data.copy())
+        dataset.data["notes"] = np.where(np.arange(dataset.data.shape[0]) % 3 == 0, "Noted", "")
+        dataset.update(["notes"])
+        specifications["Noted"] = {"notes": "^noted$"}
+        with mock.patch("src.data_processing.data_analysis.RuleSet", wraps=RuleSet) as rule_set_class:
+            result = categorize(dataset.data, specifications, cache=cache, dataset=dataset)
+        self.assertListEqual(list(rule_set_class.call_args_list[-1].args[0]), ["Noted"])
+        self.assertListEqual(result, categorize_with_filters(dataset.data, specifications))
@@ -0,0 +1,41 @@
+import os
+import shutil
+import tempfile
+
+import pandas as pd
+
+from src.config_manager import ConfigManager, DROP_DATA_KEY
+from src.data_processing.data_preprocessing import DataPreprocessor
+from src.data_processing.streaming import ChunkStore, AggregateReducer, process_in_chunks
+from tests.base_test import BaseTest
+
+
+class TestStreaming(BaseTest):
+
+    def setUp(self):
+        root_path = os.path.abspath(os.path.dirname(__file__))
+        data_path = os.path.join(root_path, "test_data")
+        self.files = [os.path.join(data_path, f) for f in os.listdir(data_path) if f.endswith(".txt")]
+        self.config = ConfigManager(os.path.join(root_path, "test_configuration/config.json")).get_config()
+        self.store_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.store_dir)
+
+    def test_chunked_processing_gives_same_data_and_aggregates(self):
+        data_processor = DataPreprocessor()
+        store = ChunkStore(self.store_dir)
+        reducer = AggregateReducer(drop_data=self.config[DROP_DATA_KEY])
+        process_in_chunks(data_processor, self.files, self.config, [store, reducer], chunk_size=50)
+
+        expected = pd.concat([self.data, self.data_filtered_out]).sort_index()
+        output = store.load().sort_index()
+        self.assertListEqual(output.index.tolist(), expected.index.tolist())
+        for column in ["id", "time", "value", "category", "labels", "notes", "is_duplicate"]:
+            self.assertListEqual(output[column].tolist(), expected[column].tolist(), column)
+
+        expected_aggregates = self.data.groupby(["year", "month", "category"])["value"].agg(["sum", "count"])
+        aggregates = reducer.get_result()
+        self.assertListEqual(aggregates.index.tolist(), expected_aggregates.index.tolist())
+        self.assertListEqual(aggregates["count"].tolist(), expected_aggregates["count"].tolist())
+        self.assertTrue(((aggregates["sum"] - expected_aggregates["sum"]).abs() < 1e-6).all())
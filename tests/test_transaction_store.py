@@ -0,0 +1,67 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.config_manager import ConfigManager
+from src.data_processing.data_preprocessing import DataPreprocessor
+from src.data_processing.transaction_store import TransactionStore
+
+
+class TestTransactionStore(unittest.TestCase):
+
+    def setUp(self):
+        root_path = os.path.abspath(os.path.dirname(__file__))
+        self.tmp_dir = tempfile.mkdtemp()
+        data_path = os.path.join(root_path, "test_data")
+        for f in os.listdir(data_path):
+            shutil.copy(os.path.join(data_path, f), self.tmp_dir)
+        self.files = sorted([os.path.join(self.tmp_dir, f) for f in os.listdir(self.tmp_dir)])
+        self.config = ConfigManager(os.path.join(root_path, "test_configuration/config.json")).get_config()
+        self.data_processor = DataPreprocessor()
+        self.store = TransactionStore(os.path.join(self.tmp_dir, "store"))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _assert_equals_full_processing(self, data, file_paths):
+        expected = self.data_processor.update_extra_columns(self.data_processor.get_data(file_paths), self.config)
+        expected = expected.sort_values(["time", "id"]).reset_index(drop=True)
+        data = data.sort_values(["time", "id"]).reset_index(drop=True)
+        pd.testing.assert_frame_equal(data[expected.columns], expected, check_dtype=False)
+
+    def test_ingest_new_file(self):
+        self.store.ingest(self.data_processor, self.files[:-1], self.config)
+        data = self.store.ingest(self.data_processor, self.files, self.config)
+        self._assert_equals_full_processing(data, self.files)
+        self.assertTrue(data["time"].is_monotonic_increasing)
+
+    def test_ingest_changed_file_and_rules(self):
+        self.store.ingest(self.data_processor, self.files, self.config)
+        with open(self.files[0], "a", encoding="utf-8") as f:
+            f.write("Test Target\t\t\t-1,0\t01.01.2014\n")
+        self.config["categories"]["New category"] = {"target": "^d"}
+        data = self.store.ingest(self.data_processor, self.files, self.config)
+        self._assert_equals_full_processing(data, self.files)
+
+    def test_ingest_removed_file(self):
+        self.store.ingest(self.data_processor, self.files, self.config)
+        data = self.store.ingest(self.data_processor, self.files[1:], self.config)
+        self._assert_equals_full_processing(data, self.files[1:])
+
+    def test_unchanged_store_is_memory_mapped(self):
+        self.store.ingest(self.data_processor, self.files, self.config)
+        data = self.store.ingest(self.data_processor, self.files, self.config)
+        self._assert_equals_full_processing(data, self.files)
+        self.assertIsInstance(data["value"].values.base, np.memmap)
+        pd.testing.assert_frame_equal(self.store.load(), data)
+
+    def test_ingest_after_empty_ingest(self):
+        self.assertEqual(self.store.ingest(self.data_processor, [], self.config).shape[0], 0)
+        self.assertEqual(self.store.load().shape[0], 0)
+        data = self.store.ingest(self.data_processor, self.files[:1], self.config)
+        self._assert_equals_full_processing(data, self.files[:1])
+        pd.testing.assert_frame_equal(self.store.load(), data)
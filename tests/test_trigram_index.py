@@ -0,0 +1,28 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.data_processing.pattern_matching import contains
+from src.data_processing.trigram_index import TrigramIndex, get_required_literals
+
+
+class TestTrigramIndex(unittest.TestCase):
+
+    def test_get_required_literals(self):
+        self.assertEqual(get_required_literals("abc.*def|^ghi"), [["abc", "def"], ["ghi"]])
+        self.assertEqual(get_required_literals("abcd?e"), [["abc", "e"]])
+        self.assertEqual(get_required_literals("ab{2,3}c(def)?gh[ij]kl\\.m"), [["a", "c", "gh", "kl.m"]])
+        self.assertEqual(get_required_literals("\\d+ euro"), [[" euro"]])
+        self.assertIsNone(get_required_literals("(?i)abc"))
+        self.assertIsNone(get_required_literals("(a)bc\\1"))
+
+    def test_contains(self):
+        strings = pd.Series(["Kauppa Oy", "KAUPPAHALLI", "kahvila", "Bank transfer", "", None, 1.5], dtype=object)
+        index = TrigramIndex(strings)
+        patterns = ["kauppa", "^kau", "pa.*oy", "kahvila|bank", "trans(fer)?", "xyz", "a", "[kb]a", "ll?i$",
+                    "(a)\\1", "(?-i:Kauppa)"]
+        for pattern in patterns:
+            np.testing.assert_array_equal(index.contains(pattern), contains(strings, pattern), err_msg=pattern)
+        np.testing.assert_array_equal(index.get_candidates("kauppa"), [0, 1])
+        self.assertIsNone(index.get_candidates("[kb]a"))
@@ -0,0 +1,45 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.data_processing.validation import validate, get_validation_report, InvalidDataFrame
+
+
+class TestValidation(unittest.TestCase):
+
+    def setUp(self):
+        self.data = pd.DataFrame({
+            "value": [-1.5, 2.0, np.nan, 3.25],
+            "time": pd.to_datetime(["2020-01-01", "2020-01-02", None, "2020-01-04"]),
+            "bank": "Nordea",
+            "target": ["a", np.nan, "c", "d"],
+            "message": np.nan,
+            "event": pd.Categorical(["x", "y", None, "x"]),
+            "account_number": "FI123",
+        })
+
+    def test_valid_data(self):
+        report = validate(self.data)
+        self.assertTrue(report.is_valid)
+        self.assertEqual([(w.column, w.rows.tolist()) for w in report.warnings], [("value", [2]), ("time", [2])])
+
+    def test_invalid_data(self):
+        self.data["target"] = ["a", 1, "c", 2.0]
+        self.data.loc[1, "bank"] = np.nan
+        self.data["extra"] = 0
+        with self.assertRaises(InvalidDataFrame) as context:
+            validate(self.data)
+        errors = {(e.column, e.message): e.rows.tolist() for e in context.exception.report.errors}
+        self.assertEqual(errors, {
+            ("extra", "the column exists in the data frame but not in the schema"): [],
+            ("bank", "this field cannot be NaN"): [1],
+            ("target", "is not string"): [1, 3],
+        })
+
+    def test_sampled_validation(self):
+        data = pd.concat([self.data] * 1000, ignore_index=True)
+        report = get_validation_report(data, sample_size=100)
+        self.assertTrue(report.is_sampled)
+        self.assertEqual(report.n_checked_rows, 100)
+        self.assertTrue(report.is_valid)